@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+#
+# Compare the size of the responses and the time to produce them
+# for the html pages and their JSON versions in /api. Uses a fake data
+# manager, so no database is needed (the time of the queries is the same
+# for both). Run benchmarks/loadtest.py against a running instance
+# to measure the latency including the database.
+#
+# Usage: benchmarks/api.py [--benchmarks N] [--runs N] [--requests N]
+
+import os
+import sys
+import gzip
+import time
+import random
+import warnings
+from io import BytesIO
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# quik complains about its own regular expressions
+warnings.simplefilter('ignore', FutureWarning)
+
+from brv.bset import BSet
+from brv.runinfo import DirectRunInfo
+from brv.toolrun import DBToolRun, ToolRunStats
+from brv.tagsmanager import Tag
+from brv.server.showfiles import showFiles
+from brv.server.showtools import showTools
+from brv.server.showresults import showResults
+from brv.groupingmanager import GroupingManager
+from brv.scoringmanager import ScoringManager
+from brv.server.api import apiFiles, apiToolRuns, apiStats
+from render import FakeTool
+
+RESULTS = [('true', 'correct'), ('false(unreach-call)', 'wrong'),
+           ('TIMEOUT', 'error'), ('unknown', 'unknown')]
+
+class FakeDataManager(object):
+    def __init__(self, benchmarks, runs):
+        random.seed(0)
+        self._runs = [DBToolRun((i, 'tool', '1.{0}'.format(i), '2017-11-10 10:20:30',
+                                 '--opt', '900 s', '8000000000B', 'run {0}'.format(i),
+                                 None, None))
+                      for i in range(1, runs + 1)]
+        self._rows = []
+        for b in range(benchmarks):
+            infos = []
+            for r in self._runs:
+                info = DirectRunInfo('sv-benchmarks/c/loops/file{0}.c'.format(b))
+                info._status, info._classification = random.choice(RESULTS)
+                info._cputime = info._walltime = random.choice([0.5, 2.1, 10.3, 900.0])
+                info._memusage = 1000000 + b
+                info._exitcode = 0
+                infos.append(info)
+            self._rows.append((1, 'loops/file{0}.c'.format(b), infos))
+        self._groupings = GroupingManager()
+        self._scorings = ScoringManager()
+
+    def getToolRuns(self, which = []):
+        return [r for r in self._runs if not which or r.getID() in which]
+
+    def getTools(self):
+        return [FakeTool([r]) for r in self._runs]
+
+    def getBenchmarksSets(self):
+        return [BSet('loops', 1)]
+
+    def getTags(self):
+        return [Tag('reference', 'color: green')]
+
+    def getToolRunTags(self, run):
+        # tag every other tool run
+        return self.getTags() if run.getID() % 2 else []
+
+    def getGrouping(self, i):
+        return self._groupings.getGrouping(i)
+
+    def getGroupingChoices(self):
+        return self._groupings.getGroupingChoices()
+
+    def getScoring(self, i):
+        return self._scorings.getScoringScheme(i)
+
+    def getScoringChoices(self):
+        return self._scorings.getScoringChoices()
+
+    def getToolInfoStats(self, run_id):
+        stats = ToolRunStats()
+        bset_stats = stats.getOrCreateStats(1, 'loops')
+        for (status, classif) in RESULTS:
+            bset_stats.addStat((status, classif), 100, 1234.5)
+        return stats
+
+    def getRunInfosPage(self, bset_ids, toolruns_id, sort,
+                        offset = 0, limit = None, filters = []):
+        if limit is None:
+            return self._rows, False
+        return self._rows[offset:offset + limit], offset + limit < len(self._rows)
+
+def measure(fun, datamanager, opts, requests):
+    start = time.perf_counter()
+    for i in range(requests):
+        out = BytesIO()
+        fun(out, datamanager, opts)
+    elapsed = time.perf_counter() - start
+    data = out.getvalue()
+    return elapsed / requests, len(data), len(gzip.compress(data))
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--benchmarks', type=int, default=500,
+                        help='Number of rows on the files page')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='Number of compared tool runs')
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    # the paths to templates are relative to the repository
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+    datamanager = FakeDataManager(args.benchmarks, args.runs)
+    run_ids = [str(r.getID()) for r in datamanager.getToolRuns()]
+    files_opts = {'run' : run_ids, 'benchmarks' : ['1'],
+                  'page_size' : [str(args.benchmarks)]}
+    cases = [('tool runs', showTools, apiToolRuns, {}),
+             ('files', showFiles, apiFiles, files_opts),
+             ('stats', showResults, apiStats, {'run' : run_ids})]
+
+    for (name, page, api, opts) in cases:
+        for (kind, fun) in (('html', page), ('json', api)):
+            elapsed, size, gzipped = measure(fun, datamanager, dict(opts), args.requests)
+            print('{0:>10} {1}: {2:7.2f} ms, {3:8.1f} kB ({4:6.1f} kB gzipped)'.format(
+                  name, kind, elapsed * 1000, size / 1024, gzipped / 1024))
+
+if __name__ == '__main__':
+    main()
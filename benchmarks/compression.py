@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+#
+# Measure the compression of the files page: the time that the server
+# spends compressing the page while it is streamed (written in the same
+# pieces as by the handler) and the size of the response. Uses the fake
+# data manager from benchmarks/api.py, so no database is needed.
+# brotli is measured only if it is installed.
+#
+# Usage: benchmarks/compression.py [--benchmarks N] [--runs N]
+
+import os
+import sys
+import time
+import warnings
+from io import BytesIO
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# quik complains about its own regular expressions
+warnings.simplefilter('ignore', FutureWarning)
+
+from brv.server import compression
+from brv.server.compression import Compressor
+from brv.server.showfiles import showFiles
+from api import FakeDataManager
+
+class Pieces(object):
+    """
+    Remembers the pieces written by the handler
+    """
+
+    def __init__(self):
+        self.pieces = []
+
+    def write(self, data):
+        self.pieces.append(bytes(data))
+
+    def flush(self):
+        self.pieces.append(None)
+
+def replay(pieces, out):
+    for p in pieces:
+        if p is None:
+            out.flush()
+        else:
+            out.write(p)
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--benchmarks', type=int, default=20000,
+                        help='Number of rows on the files page')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Number of compared tool runs')
+    args = parser.parse_args()
+
+    # the paths to templates are relative to the repository
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+    datamanager = FakeDataManager(args.benchmarks, args.runs)
+    run_ids = [str(r.getID()) for r in datamanager.getToolRuns()]
+    opts = {'run' : run_ids, 'benchmarks' : ['1'],
+            'page_size' : [str(args.benchmarks)]}
+
+    page = Pieces()
+    start = time.perf_counter()
+    showFiles(page, datamanager, opts)
+    rendering = time.perf_counter() - start
+    size = sum(len(p) for p in page.pieces if p is not None)
+    print('files page: {0} rows, {1:.1f} MB, rendered in {2:.2f} s'.format(
+          args.benchmarks, size / 10**6, rendering))
+
+    encodings = ['gzip']
+    if compression.brotli is not None:
+        encodings.append('br')
+    for enc in encodings:
+        out = BytesIO()
+        comp = Compressor(out, enc)
+        start = time.perf_counter()
+        replay(page.pieces, comp)
+        comp.close()
+        elapsed = time.perf_counter() - start
+        print('{0:>10}: {1:.2f} s, {2:.1f} MB ({3:.1f} % of the page)'.format(
+              enc, elapsed, len(out.getvalue()) / 10**6,
+              100 * len(out.getvalue()) / size))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Measure how a running mamato instance copes with many idle connections
+# (e.g., browsers that opened connections in advance or keep them alive).
+# Opens the idle connections, then sends requests over new connections
+# and reports their latency and how many of them timed out.
+# Compare the default server with the one started with --async, e.g.:
+#   ./brv.py --workers 4 &
+#   benchmarks/connections.py --idle 200 'http://localhost:3000/'
+#
+# Usage: benchmarks/connections.py [--idle N] [--requests N] [--timeout S] URL
+
+import time
+import socket
+from argparse import ArgumentParser
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+from loadtest import percentile
+
+def fetch(url, timeout):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    start = time.perf_counter()
+    conn = HTTPConnection(parts.hostname, parts.port or 80, timeout = timeout)
+    try:
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        resp.read()
+        ok = resp.status == 200
+    except (socket.timeout, ConnectionError):
+        ok = False
+    finally:
+        conn.close()
+    return time.perf_counter() - start, ok
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--idle', type=int, default=200,
+                        help='Number of idle connections')
+    parser.add_argument('-n', '--requests', type=int, default=20,
+                        help='Number of requests sent while the connections are idle')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Seconds after which a request is considered failed')
+    parser.add_argument('url', metavar='URL')
+    args = parser.parse_args()
+
+    parts = urlsplit(args.url)
+    idle = []
+    try:
+        for i in range(args.idle):
+            idle.append(socket.create_connection((parts.hostname, parts.port or 80)))
+
+        results = [fetch(args.url, args.timeout) for i in range(args.requests)]
+    finally:
+        for s in idle:
+            s.close()
+
+    latencies = sorted(r[0] for r in results)
+    failed = sum(1 for r in results if not r[1])
+    print('{0} idle connections, {1} requests, {2} failed or timed out after {3} s'.format(
+          len(idle), len(results), failed, args.timeout))
+    print('Latency p50: {0:.1f} ms, p90: {1:.1f} ms, max: {2:.1f} ms'.format(
+          percentile(latencies, 50) * 1000, percentile(latencies, 90) * 1000,
+          latencies[-1] * 1000))
+
+if __name__ == '__main__':
+    main()
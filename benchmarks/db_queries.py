@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+#
+# Measure the latency of the queries that are executed when browsing
+# results. Run it before and after './brv.py --migrate' to see the effect
+# of the indexes.
+#
+# Usage: benchmarks/db_queries.py [--db FILE] [--populate N] [--memory] [--run ID ...]
+#
+# --populate N stores N synthetic runs (in 10 benchmark sets) under a new
+# tool run first, so that there is something big to query.
+#
+# --memory compares the peak RSS of reading all runs of the tool run
+# at once (fetchall) and lazily through a server-side cursor
+# (getAllRunInfos). Each mode runs in a fresh process.
+
+import os
+import sys
+import time
+import resource
+from argparse import ArgumentParser
+from multiprocessing import Process, Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brv.database.reader import DatabaseReader
+from brv.database.writer import DatabaseWriter
+from brv.database.migrations import DatabaseMigrator
+from brv.runinfo import DirectRunInfo, DBRunInfo
+from brv.toolrun import ToolRun
+
+BSETS = 10
+
+def synthetic_runs(cnt, bset):
+    for i in range(cnt):
+        r = DirectRunInfo('sv-benchmarks/c/bench-{0}/file{1}.c'.format(bset, i))
+        r._status, r._classification = (('true', 'correct'), ('false(unreach-call)', 'wrong'),
+                                        ('TIMEOUT', 'error'), ('unknown', 'unknown'))[i % 4]
+        r._cputime = (i % 900) + 0.5
+        r._walltime = (i % 900) + 0.7
+        r._memusage = 1000000 + i
+        r._exitcode = 0
+        r._property = 'unreach-call'
+        r._prefix = 'synthetic'
+        yield r
+
+def populate(conffile, cnt):
+    writer = DatabaseWriter(conffile)
+    tool_info = ToolRun()
+    tool_info.tool = 'synthetic'
+    tool_info.tool_version = str(int(time.time()))
+    tool_info.options = ''
+    tool_info.memlimit = '8000000000B'
+    tool_info.timelimit = '900 s'
+    tool_info.date = time.strftime('%Y-%m-%d %H:%M:%S')
+    tool_info.benchmarkname = 'synthetic'
+    tool_info.description = '{0} runs'.format(cnt)
+    tool_run_id = writer.getOrCreateToolInfoID(tool_info)
+
+    start = time.perf_counter()
+    for b in range(BSETS):
+        bset_id = writer.getOrCreateBenchmarksSetID('synthetic-{0}'.format(b))
+        writer.writeRunInfos(tool_run_id, bset_id, synthetic_runs(cnt // BSETS, b), 5000)
+        writer.commit()
+    print('Stored {0} runs under tool run {1} in {2:.1f} s'.format(
+          cnt, tool_run_id, time.perf_counter() - start))
+    return tool_run_id
+
+def measure(name, fun, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fun()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print('{0:>20}: median {1:8.2f} ms, max {2:8.2f} ms'.format(
+          name, times[len(times) // 2] * 1000, times[-1] * 1000))
+
+def read_runs(conffile, tool_run_id, lazy, queue):
+    reader = DatabaseReader(conffile)
+    start = time.perf_counter()
+    if lazy:
+        cnt = 0
+        for r in reader.getAllRunInfos(tool_run_id):
+            cnt += 1
+    else:
+        # what getAllRunInfos did before it was lazy
+        res = reader.query("""
+        SELECT status, cputime, walltime, memusage,
+               classification, exitcode, property, file, prefix
+        FROM run WHERE tool_run_id = '{0}'
+        ORDER BY file ASC;
+        """.format(tool_run_id))
+        cnt = len([DBRunInfo(r) for r in res])
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    queue.put((cnt, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+def measure_memory(conffile, tool_run_id):
+    for (name, lazy) in (('fetchall', False), ('lazy', True)):
+        queue = Queue()
+        proc = Process(target=read_runs, args=(conffile, tool_run_id, lazy, queue))
+        proc.start()
+        cnt, elapsed, rss = queue.get()
+        proc.join()
+        print('{0:>20}: {1} runs, {2:.2f} s, peak RSS {3:.1f} MB'.format(
+              name, cnt, elapsed, rss / 1024))
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--db', default='database.conf', metavar='FILE',
+                        help='Name of file that contains database configuration')
+    parser.add_argument('--populate', type=int, default=0, metavar='N',
+                        help='Store N synthetic runs before measuring')
+    parser.add_argument('--run', type=int, nargs='*', default=[], metavar='ID',
+                        help='Tool runs to query (default: the largest one)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--memory', action='store_true',
+                        help='Measure the memory used by reading all runs of the tool runs')
+    args = parser.parse_args()
+
+    print('Database scheme version: {0}'.format(
+          DatabaseMigrator(args.db).getSchemaVersion()))
+
+    run_ids = args.run
+    if args.populate:
+        run_ids = [populate(args.db, args.populate)]
+
+    reader = DatabaseReader(args.db)
+    if not run_ids:
+        run_ids = [reader.queryInt("""
+        SELECT tool_run_id FROM run GROUP BY tool_run_id
+        ORDER BY count(*) DESC LIMIT 1;""")]
+
+    for trid in run_ids:
+        bsets = [r[0] for r in reader.query("""
+        SELECT DISTINCT benchmarks_set_id FROM run
+        WHERE tool_run_id = {0};""".format(trid))]
+        print('Tool run {0}: {1} runs in {2} benchmark sets'.format(
+              trid, reader.queryInt("SELECT count(*) FROM run WHERE tool_run_id = {0};".format(trid)),
+              len(bsets)))
+
+        measure('getRunCount', lambda: [reader.getRunCount(trid, b) for b in bsets], args.repeat)
+        measure('getToolInfoStats', lambda: reader.getToolInfoStats(trid), args.repeat)
+        measure('getRunInfos', lambda: [list(reader.getRunInfos(b, trid)) for b in bsets],
+                args.repeat)
+        measure('getAllRunInfos', lambda: list(reader.getAllRunInfos(trid)), args.repeat)
+        if args.memory:
+            measure_memory(args.db, trid)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+#
+# Measure the filters that the server evaluates in Python (regular
+# expressions on statuses and the buckets of /filter, the rest is done
+# by the database) on a synthetic comparison of several tool runs
+# and compare them with the filter() chains the handlers used before.
+# Some rows have no results at all (every tool run is missing).
+#
+# Usage: benchmarks/filters.py [--rows N] [--tools T] [--repeat R]
+
+import os
+import sys
+import time
+import random
+from argparse import ArgumentParser
+from re import compile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brv.runinfo import DirectRunInfo
+from brv.server.filtering import filterRows
+
+RESULTS = [('true', 'correct'), ('false(unreach-call)', 'wrong'),
+           ('TIMEOUT', 'error'), ('unknown', 'unknown'),
+           ('false(unreach-call)', 'correct')]
+
+def generate(rows, tools):
+    random.seed(0)
+    ret = []
+    for i in range(rows):
+        infos = []
+        for t in range(tools):
+            # some tools do not have results for some benchmarks
+            if random.random() < 0.05:
+                infos.append(None)
+                continue
+            r = DirectRunInfo('sv-benchmarks/c/file{0}.c'.format(i))
+            r._status, r._classification = random.choice(RESULTS)
+            r._cputime = random.choice([0.5, 2, 3, 10, 11, 100])
+            infos.append(r)
+        ret.append((1, 'file{0}.c'.format(i), infos))
+    # a benchmark without any results
+    ret.append((1, 'missing.c', [None] * tools))
+    return ret
+
+# the filters as they were evaluated by the handlers
+def status_match(filters):
+    def fun(x):
+        for rf in filters:
+            if not any(r is not None and rf.search(r.status()) for r in x[2]):
+                return False
+        return True
+    return fun
+
+def correct_buckets(allowed):
+    def fun(x):
+        for (r, pairs) in zip(x[2], allowed):
+            if r is None:
+                return False
+            if (r.status(), r.classification()) not in pairs:
+                return False
+        return True
+    return fun
+
+def measure(fun, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        res = fun()
+        times.append(time.perf_counter() - start)
+    return min(times), res
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--tools', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = generate(args.rows, args.tools)
+    print('{0} rows x {1} tools'.format(len(rows), args.tools))
+
+    regex = [compile('false')]
+    allowed = [set(RESULTS[:3])] * args.tools
+    cases = [('status filter', regex, None, status_match(regex)),
+             ('buckets', [], allowed, correct_buckets(allowed)),
+             ('both', regex, allowed,
+              lambda x: status_match(regex)(x) and correct_buckets(allowed)(x))]
+
+    for (name, status_filters, buckets, row_filter) in cases:
+        old, expected = measure(lambda: list(filter(row_filter, rows)), args.repeat)
+        new, got = measure(lambda: filterRows(rows, status_filters, buckets), args.repeat)
+        assert got == expected, name
+        print('{0:>15}: filter() {1:7.1f} ms, filterRows() {2:7.1f} ms, {3} rows match'.format(
+              name, old * 1000, new * 1000, len(got)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#
+# Fire concurrent requests at a running mamato instance and report
+# the latency percentiles.
+#
+# Usage: benchmarks/loadtest.py [--concurrency C] [--requests N] URL [URL ...]
+#
+# The URLs are requested in a round-robin manner, e.g.:
+#   benchmarks/loadtest.py -c 8 -n 200 'http://localhost:3000/' \
+#       'http://localhost:3000/files?run=1&run=2&benchmarks=3'
+
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+def fetch(url, headers):
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers = headers)) as resp:
+            size = len(resp.read())
+            ok = resp.status == 200
+    except Exception as e:
+        print('{0}: {1}'.format(url, e), file=sys.stderr)
+        size = 0
+        ok = False
+    return time.perf_counter() - start, size, ok
+
+def percentile(values, p):
+    if not values:
+        return 0
+    idx = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[idx]
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='Number of requests in flight at once')
+    parser.add_argument('-n', '--requests', type=int, default=100,
+                        help='Total number of requests')
+    parser.add_argument('-H', '--header', action='append', default=[],
+                        metavar='NAME:VALUE', help='Add a header to the requests')
+    parser.add_argument('urls', nargs='+', metavar='URL')
+    args = parser.parse_args()
+
+    headers = dict(map(lambda h: map(str.strip, h.split(':', 1)), args.header))
+    urls = [args.urls[i % len(args.urls)] for i in range(args.requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = args.concurrency) as pool:
+        results = list(pool.map(lambda u: fetch(u, headers), urls))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[0] for r in results)
+    errors = sum(1 for r in results if not r[2])
+    size = sum(r[1] for r in results)
+    print('{0} requests, concurrency {1}, {2} errors'.format(len(results), args.concurrency, errors))
+    print('Total time: {0:.2f} s, {1:.1f} requests/s, {2:.1f} kB/response'.format(
+          elapsed, len(results) / elapsed, size / len(results) / 1024))
+    print('Latency p50: {0:.1f} ms, p90: {1:.1f} ms, p99: {2:.1f} ms, max: {3:.1f} ms'.format(
+          percentile(latencies, 50) * 1000, percentile(latencies, 90) * 1000,
+          percentile(latencies, 99) * 1000, latencies[-1] * 1000))
+
+if __name__ == '__main__':
+    main()
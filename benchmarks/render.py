@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+#
+# Measure how many requests for '/' (the list of tools) per second
+# can be rendered with the different modes of caching templates.
+# Uses a fake data manager, so no database is needed.
+#
+# Usage: benchmarks/render.py [--requests N] [--tools N]
+
+import os
+import sys
+import time
+from io import BytesIO
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brv.server import rendering
+from brv.server.showtools import showTools
+
+class FakeToolRun(object):
+    def __init__(self, i):
+        self._i = i
+
+    def getID(self): return self._i
+    def tool(self): return 'tool{0}'.format(self._i % 5)
+    def tool_version(self): return '1.{0}'.format(self._i % 3)
+    def date(self): return '2017-11-10 10:{0:02}:00'.format(self._i % 60)
+    def options(self): return '--opt'
+    def timelimit(self): return '900 s'
+    def memlimit(self): return '8000000000B'
+    def run_description(self): return 'run {0}'.format(self._i)
+    def tags(self): return None
+    def outputs(self): return None
+    def name(self): return None
+
+class FakeTool(object):
+    def __init__(self, runs):
+        self._runs = runs
+
+    def name(self): return self._runs[0].tool()
+    def version(self): return self._runs[0].tool_version()
+    def options(self): return self._runs[0].options()
+
+    def getRuns(self, filt = None):
+        if filt:
+            return [r for r in self._runs if filt(r)]
+        return self._runs
+
+class FakeDataManager(object):
+    def __init__(self, ntools):
+        runs = [FakeToolRun(i) for i in range(ntools)]
+        self._tools = [FakeTool([r]) for r in runs]
+
+    def getTools(self): return self._tools
+    def getTags(self): return []
+    def getToolRunTags(self, run): return []
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--tools', type=int, default=50,
+                        help='Number of tool runs on the page')
+    args = parser.parse_args()
+
+    # the paths to templates are relative to the repository
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+    datamanager = FakeDataManager(args.tools)
+    for mode in rendering.CACHE_MODES:
+        rendering.set_template_cache(mode)
+        start = time.perf_counter()
+        for i in range(args.requests):
+            showTools(BytesIO(), datamanager, {})
+        elapsed = time.perf_counter() - start
+        print('{0:>8}: {1:.1f} requests/s'.format(mode, args.requests / elapsed))
+
+if __name__ == '__main__':
+    main()
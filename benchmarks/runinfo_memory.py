@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+#
+# Measure the memory taken by runinfos that are read from the database,
+# stored as DBRunInfo objects (each wrapping the row of the result)
+# and in a RunInfoBlock. The rows are generated the way the database
+# driver creates them: every row has its own tuple and strings.
+#
+# Usage: benchmarks/runinfo_memory.py [--runs N]
+
+import os
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brv.runinfo import DBRunInfo, DirectRunInfo, RunInfoBlock
+
+RESULTS = [('true', 'correct'), ('false(unreach-call)', 'wrong'),
+           ('TIMEOUT', 'error'), ('unknown', 'unknown')]
+
+def fresh(s):
+    # a new string object with the same value
+    return ''.join(list(s))
+
+def rows(cnt):
+    for i in range(cnt):
+        status, classif = RESULTS[i % 4]
+        yield (fresh(status), (i % 900) + 0.5, (i % 900) + 0.7, 1000000 + i,
+               fresh(classif), 0, fresh('unreach-call'),
+               'sv-benchmarks/c/loops/file{0}.c'.format(i), fresh('tool'))
+
+def as_dbruninfos(cnt):
+    return [DBRunInfo(r) for r in rows(cnt)]
+
+def as_block(cnt):
+    block = RunInfoBlock()
+    return [block.append(r) for r in rows(cnt)]
+
+def as_directruninfos(cnt):
+    ret = []
+    for r in rows(cnt):
+        info = DirectRunInfo(r[7])
+        info._status, info._cputime, info._walltime, info._memusage = r[0:4]
+        info._classification, info._exitcode, info._property = r[4:7]
+        info._prefix = r[8]
+        ret.append(info)
+    return ret
+
+def measure(fun, cnt):
+    tracemalloc.start()
+    start = time.perf_counter()
+    infos = fun(cnt)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # check that the runinfos work
+    assert infos[-1].status() == RESULTS[(cnt - 1) % 4][0]
+    return size, elapsed
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--runs', type=int, default=200000)
+    args = parser.parse_args()
+
+    for (name, fun) in (('DBRunInfo', as_dbruninfos),
+                        ('DirectRunInfo', as_directruninfos),
+                        ('RunInfoBlock', as_block)):
+        size, elapsed = measure(fun, args.runs)
+        print('{0:>15}: {1} runs, {2:.1f} MB ({3:.0f} B per run), {4:.2f} s'.format(
+              name, args.runs, size / 2**20, size / args.runs, elapsed))
+
+if __name__ == '__main__':
+    main()
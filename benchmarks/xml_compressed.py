@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#
+# Compare importing a compressed benchexec result the old way
+# (decompress the whole file into memory, write it to a temporary file
+# and parse that file) with parsing the decompressed stream directly.
+# Every mode runs in a fresh process, so that the peak RSS values
+# are not shared. About 1.5 million runs give 1 GB of uncompressed xml.
+#
+# Usage: benchmarks/xml_compressed.py [--runs N] [--format bz2|gz|xz]
+
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import time
+import resource
+from argparse import ArgumentParser
+from multiprocessing import Process, Queue
+from shutil import copyfileobj
+from tempfile import NamedTemporaryFile, mkdtemp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brv.xml.parser import XMLParser, _open
+from xml_parser import generate
+
+FORMATS = {'bz2' : bz2, 'gz' : gzip, 'xz' : lzma}
+
+def parse_runs(parser, path):
+    tool_info, runs = parser.parse(path)
+    cnt = 0
+    for r in runs:
+        cnt += 1
+    return cnt
+
+def via_tempfile(parser, path):
+    # what the directory importer used to do
+    with _open(path) as f:
+        data = f.read()
+    tmpfile = NamedTemporaryFile(suffix='.xml', delete=False)
+    tmpfile.write(data)
+    tmpfile.close()
+    try:
+        return parse_runs(parser, tmpfile.name)
+    finally:
+        os.unlink(tmpfile.name)
+
+def streamed(parser, path):
+    return parse_runs(parser, path)
+
+def measure(fun, path, queue):
+    parser = XMLParser()
+    start = time.perf_counter()
+    cnt = fun(parser, path)
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((cnt, elapsed, rss))
+
+def run_mode(fun, path):
+    queue = Queue()
+    proc = Process(target=measure, args=(fun, path, queue))
+    proc.start()
+    res = queue.get()
+    proc.join()
+    return res
+
+def compress(src, dst, module):
+    with open(src, 'rb') as i, module.open(dst, 'wb') as o:
+        copyfileobj(i, o)
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--runs', type=int, default=200000,
+                        help='Number of <run> elements in the generated file')
+    parser.add_argument('--format', default='bz2', choices=sorted(FORMATS))
+    args = parser.parse_args()
+
+    tmpdir = mkdtemp()
+    xml = os.path.join(tmpdir, 'results.xml')
+    path = xml + '.' + args.format
+    try:
+        generate(xml, args.runs)
+        size = os.path.getsize(xml)
+        compress(xml, path, FORMATS[args.format])
+        os.unlink(xml)
+        print('Generated {0} runs ({1:.1f} MB, {2:.1f} MB compressed by {3})'.format(
+              args.runs, size / 10**6, os.path.getsize(path) / 10**6, args.format))
+
+        for (name, fun) in (('temp file', via_tempfile), ('streamed', streamed)):
+            cnt, elapsed, rss = run_mode(fun, path)
+            # ru_maxrss is in kilobytes on Linux
+            print('{0:>10}: {1} runs, {2:.2f} s, peak RSS {3:.1f} MB'.format(
+                  name, cnt, elapsed, rss / 1024))
+    finally:
+        for f in os.listdir(tmpdir):
+            os.unlink(os.path.join(tmpdir, f))
+        os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+#
+# Compare the minidom and the iterparse (streaming) modes of XMLParser.
+# Generates a synthetic benchexec result file and parses it in a fresh
+# process for each mode, so that the peak RSS values are not shared.
+#
+# Usage: benchmarks/xml_parser.py [--runs N] [--keep FILE]
+
+import os
+import sys
+import time
+import resource
+from argparse import ArgumentParser
+from multiprocessing import Process, Queue
+from tempfile import NamedTemporaryFile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brv.xml.parser import XMLParser
+
+HEADER = '''<?xml version="1.0" ?>
+<!DOCTYPE result PUBLIC "+//IDN sosy-lab.org//DTD BenchExec result 1.9//EN" "http://www.sosy-lab.org/benchexec/result-1.9.dtd">
+<result benchmarkname="bench" block="ReachSafety-Loops" date="2017-11-10 10:20:30 CET" endtime="2017-11-10T10:20:30.000000+01:00" memlimit="8000000000B" name="bench.2017-11-10_1020.results.sv-comp.ReachSafety-Loops" options="--opt" starttime="2017-11-10T10:20:30.000000+01:00" timelimit="900 s" tool="Tool" version="1.0">
+  <columns>
+    <column title="status"/>
+    <column title="cputime"/>
+    <column title="walltime"/>
+  </columns>
+  <systeminfo hostname="host"><os name="Linux"/><cpu cores="8" frequency="3000000000Hz" model="CPU"/><ram size="16000000000B"/></systeminfo>
+'''
+
+RUN = '''  <run files="[../sv-benchmarks/c/loops/file{0}.c]" name="../sv-benchmarks/c/loops/file{0}.c" properties="unreach-call">
+    <column title="status" value="{1}"/>
+    <column title="cputime" value="{2:.6f}s"/>
+    <column title="walltime" value="{3:.6f}s"/>
+    <column hidden="true" title="category" value="{4}"/>
+    <column hidden="true" title="memUsage" value="{5}B"/>
+    <column hidden="true" title="exitcode" value="0"/>
+    <column hidden="true" title="returnvalue" value="0"/>
+    <column hidden="true" title="host" value="host"/>
+    <column hidden="true" title="starttime" value="2017-11-10T10:20:30.000000+01:00"/>
+  </run>
+'''
+
+def generate(path, runs):
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        for i in range(runs):
+            status, classif = (('true', 'correct'), ('false(unreach-call)', 'wrong'),
+                               ('TIMEOUT', 'error'), ('unknown', 'unknown'))[i % 4]
+            f.write(RUN.format(i, status, (i % 900) + 0.5, (i % 900) + 0.7,
+                               classif, 1000000 + i))
+        f.write('</result>\n')
+
+def measure(path, streaming, queue):
+    parser = XMLParser(streaming = streaming)
+    start = time.perf_counter()
+    tool_info, runs = parser.parse(path)
+    cnt = 0
+    for r in runs:
+        cnt += 1
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((cnt, elapsed, rss))
+
+def run_mode(path, streaming):
+    queue = Queue()
+    proc = Process(target=measure, args=(path, streaming, queue))
+    proc.start()
+    res = queue.get()
+    proc.join()
+    return res
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--runs', type=int, default=50000,
+                        help='Number of <run> elements in the generated file')
+    parser.add_argument('--keep', default=None, metavar='FILE',
+                        help='Write the generated xml to FILE and keep it')
+    args = parser.parse_args()
+
+    if args.keep:
+        path = args.keep
+    else:
+        tmp = NamedTemporaryFile(suffix='.xml', delete=False)
+        tmp.close()
+        path = tmp.name
+
+    try:
+        generate(path, args.runs)
+        print('Generated {0} runs ({1:.1f} MB)'.format(args.runs,
+                                                     os.path.getsize(path) / 10**6))
+        for (name, streaming) in (('minidom', False), ('iterparse', True)):
+            cnt, elapsed, rss = run_mode(path, streaming)
+            # ru_maxrss is in kilobytes on Linux
+            print('{0:>10}: {1} runs, {2:.2f} s, peak RSS {3:.1f} MB'.format(
+                  name, cnt, elapsed, rss / 1024))
+    finally:
+        if not args.keep:
+            os.unlink(path)
+
+if __name__ == '__main__':
+    main()
@@ -16,7 +16,9 @@ def parse_cmd():
     parser.add_argument('--outputs', default=None,
                         help='Name of the .zip archive with tool\'s outputs')
     parser.add_argument('--results-dir', default=None, metavar='DIR',
-                        help='Load results (.zip and .xml/bz2 files) from DIR')
+                        help='Load results (.zip and .xml/.xml.bz2/.xml.gz/.xml.xz files) from DIR')
+    parser.add_argument('--watch', default=None, metavar='DIR',
+                        help='Keep importing new results (like --results-dir) from DIR as they appear')
     parser.add_argument('--svcomp', nargs='*', default=None, metavar='FILES',
                         help='Download and import results from SV-COMP emails')
     parser.add_argument('--description', default=None,
@@ -25,7 +27,21 @@ def parse_cmd():
     parser.add_argument('--append-vers', default=None,
                         help='Append the given string to the version of the tool. Can be used to store another run on the same version and distinguish it')
     parser.add_argument('--allow-duplicates', action='store_true', default=False,
-                        help='Store also results that we already have')
+                        help='Store also results that we already have (do not skip the files in the import ledger)')
+    parser.add_argument('--batch-size', default=1000, type=int, metavar='N',
+                        help='Number of results stored to the database in one INSERT when importing')
+    parser.add_argument('--jobs', default=1, type=int, metavar='N',
+                        help='Number of processes that parse the imported files in parallel')
+    parser.add_argument('--workers', default=1, type=int, metavar='N',
+                        help='Number of threads that serve requests in the web interface')
+    parser.add_argument('--async', dest='async_server', action='store_true', default=False,
+                        help='Serve the web interface from an event loop that keeps connections alive (the requests are still handled by the workers)')
+    parser.add_argument('--page-cache', default=64, type=int, metavar='MB',
+                        help='Size of the cache of rendered pages in the web interface (0 turns it off)')
+    parser.add_argument('--dev', action='store_true', default=False,
+                        help='Reload templates of the web interface when they are modified')
+    parser.add_argument('--migrate', action='store_true', default=False,
+                        help='Update the scheme of the database to the latest version and exit')
     parser.add_argument('files', nargs="*", metavar="FILES",
                         help="XML files. If given, no server is run and the files are parsed and stored to dtabase")
     return parser.parse_args()
@@ -63,7 +79,36 @@ def print_col(msg, color=None):
     stdout.flush()
 
 def start_server(args):
-    BRVServer.establish()
+    if args.workers < 1:
+        print_col('The number of workers must be positive', 'RED')
+        return
+
+    if args.page_cache < 0:
+        print_col('The size of the page cache must not be negative', 'RED')
+        return
+
+    from brv.server.pagecache import set_page_cache
+    set_page_cache(args.page_cache * 1024 * 1024)
+
+    if args.dev:
+        from brv.server.rendering import set_template_cache
+        from brv.server.handler import set_http_caching
+        from brv.server.static import set_static_reload
+        set_template_cache('mtime')
+        set_static_reload(True)
+        # the pages change with the templates
+        set_http_caching(False)
+        set_page_cache(0)
+
+    # read the static files before serving the first request
+    from brv.server.static import get_static_assets
+    get_static_assets()
+
+    if args.async_server:
+        from brv.server.asyncserver import AsyncBRVServer
+        AsyncBRVServer.establish(workers = args.workers)
+    else:
+        BRVServer.establish(workers = args.workers)
 
 def is_importing_results(args):
     return args.results_dir or args.files or args.svcomp
@@ -71,7 +116,13 @@ def is_importing_results(args):
 if __name__ == "__main__":
     args = parse_cmd()
 
-    if is_importing_results(args):
+    if args.migrate:
+        from brv.database.migrations import perform_migration
+        perform_migration(args)
+    elif args.watch:
+        from brv.importer.importer import perform_watch
+        perform_watch(args)
+    elif is_importing_results(args):
         from brv.importer.importer import perform_import
         perform_import(args)
     else:
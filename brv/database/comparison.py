@@ -0,0 +1,33 @@
+# Filters of the comparison of tool runs. The conditions are evaluated
+# over all runs of a benchmark (a group of rows of the 'run' table)
+# and {runs} is the number of compared tool runs. A missing result
+# of a tool run is different from any result.
+COMPARISON_FILTERS = {
+    # some tool run has different status or classification
+    'different_result'  : """COUNT(DISTINCT tool_run_id) < {runs}
+                             OR COUNT(DISTINCT COALESCE(status, ''),
+                                      COALESCE(classification, '')) > 1""",
+    'different_status'  : """COUNT(DISTINCT tool_run_id) < {runs}
+                             OR COUNT(DISTINCT COALESCE(status, '')) > 1""",
+    'different_classif' : """COUNT(DISTINCT tool_run_id) < {runs}
+                             OR COUNT(DISTINCT COALESCE(classification, '')) > 1""",
+    'incorrect'         : "SUM(classification = 'wrong') > 0",
+    # the missing results are ignored here
+    'time_diff_10'      : "MIN(cputime) > 1 AND MAX(cputime) > MIN(cputime) * 1.1",
+    'time_diff_50'      : "MIN(cputime) > 1 AND MAX(cputime) > MIN(cputime) * 1.5",
+    # all tool runs have a result
+    'all_present'       : "COUNT(DISTINCT tool_run_id) = {runs}",
+}
+
+def comparisonHaving(filters, runs_num):
+    """
+    Return the HAVING clause of the query grouped by benchmarks
+    for the given 'filters' (keys of COMPARISON_FILTERS)
+    when comparing 'runs_num' tool runs
+    """
+    if not filters:
+        return ''
+
+    conds = ['({0})'.format(COMPARISON_FILTERS[f].format(runs = runs_num))
+             for f in filters]
+    return 'HAVING ' + ' AND '.join(conds)
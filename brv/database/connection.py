@@ -27,18 +27,31 @@ from .. utils import err
 
 try:
     import MySQLdb
+    from MySQLdb.cursors import SSCursor
 except ImportError:
     err('Couldn\'t use database from python, please install MySQLdb package '\
         '("pip install mysqlclient")')
 
 from os.path import abspath
+from threading import Condition, local
+from time import time
 
 class QueryResult(object):
     """
-    Simple wrapper around cursor that contains also iterators
+    Iterator over the result of a query that reads the rows from
+    the server in batches as they are needed (the result is not stored
+    on the client). The connection used by the query is busy until
+    all rows are read or close() is called, and it is returned to the
+    pool after that. The thread may execute other queries meanwhile,
+    but they need another connection from the pool (see
+    DatabaseConnection.query_lazy).
     """
-    def __init__(self, cursor):
+    def __init__(self, cursor, release, batch_size = 1000):
         self._cursor = cursor
+        self._release = release
+        self._batch_size = batch_size
+        self._rows = []
+        self._pos = 0
 
     def __iter__(self):
         return self
@@ -47,65 +60,328 @@ class QueryResult(object):
         return self.next()
 
     def next(self):
-        row = self._cursor.fetchone()
-        if row is None:
-            raise StopIteration
-        else:
-            return row
+        if self._pos == len(self._rows):
+            if self._cursor is None:
+                raise StopIteration
+
+            self._rows = self._cursor.fetchmany(self._batch_size)
+            self._pos = 0
+            if not self._rows:
+                self.close()
+                raise StopIteration
+
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def batches(self):
+        """
+        Iterate over the rest of the result in lists of rows as they
+        are read from the server (at most 'batch_size' rows in a list)
+        """
+        if self._pos < len(self._rows):
+            rows = self._rows[self._pos:]
+            self._rows = []
+            self._pos = 0
+            yield rows
+
+        while self._cursor is not None:
+            rows = self._cursor.fetchmany(self._batch_size)
+            if not rows:
+                self.close()
+                return
+            yield rows
+
+    def close(self):
+        """
+        Stop reading the result (if it is not read yet)
+        and give the connection back
+        """
+        if self._cursor is None:
+            return
+
+        cursor = self._cursor
+        self._cursor = None
+        self._rows = []
+        self._pos = 0
+        try:
+            # reads (and throws away) the rest of the result
+            cursor.close()
+        finally:
+            self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+class ConnectionPool(object):
+    """
+    Pool of open connections to the database. Connections are checked
+    before they are handed out and replaced by new ones if they were
+    closed by the server. At most 'maxsize' connections are open at once,
+    further requests for a connection wait until some connection
+    is returned to the pool.
+    """
+
+    def __init__(self, credentials, minsize = 1, maxsize = 8):
+        assert 0 <= minsize <= maxsize and maxsize > 0
+        self._credentials = credentials
+        self._maxsize = maxsize
+        self._cond = Condition()
+        # connections that are not used at this moment
+        self._idle = []
+        # the number of all open connections (idle and used)
+        self._size = 0
+
+        # counters for monitoring
+        self._hits = 0
+        self._misses = 0
+        self._reconnects = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+        for i in range(minsize):
+            self._idle.append(self._open())
+            self._size += 1
+
+    def _open(self):
+        host, user, passwd, db = self._credentials
+        try:
+            conn = MySQLdb.connect(host = host, user = user,
+                                   passwd = passwd, db = db)
+        except MySQLdb.Error as e:
+            err('{0}\n'.format(str(e)))
+
+        # we start a transaction explicitly when modifying the database,
+        # reading is done in autocommit mode so that we do not look
+        # at an old snapshot of the database
+        conn.autocommit(True)
+        return conn
+
+    def _check(self, conn):
+        """
+        Return the connection if it is alive, otherwise a new connection
+        """
+        try:
+            conn.ping()
+            return conn
+        except MySQLdb.Error as e:
+            print("Connection to the database is broken ({0}), reconnecting".format(str(e)))
+            try:
+                conn.close()
+            except MySQLdb.Error:
+                pass
+
+        with self._cond:
+            self._reconnects += 1
+        return self._open()
+
+    def acquire(self):
+        """
+        Take a connection from the pool (open a new one if there
+        is no idle connection and the pool is not full)
+        """
+        with self._cond:
+            if not self._idle and self._size >= self._maxsize:
+                self._waits += 1
+                start = time()
+                while not self._idle and self._size >= self._maxsize:
+                    self._cond.wait()
+                waited = time() - start
+                self._wait_time += waited
+                self._max_wait_time = max(self._max_wait_time, waited)
+
+            if self._idle:
+                self._hits += 1
+                conn = self._idle.pop()
+            else:
+                self._misses += 1
+                self._size += 1
+                conn = None
+
+        if conn is None:
+            try:
+                return self._open()
+            except BaseException:
+                self._forget()
+                raise
+
+        try:
+            return self._check(conn)
+        except BaseException:
+            self._forget()
+            raise
+
+    def release(self, conn):
+        """
+        Return the connection to the pool
+        """
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def discard(self, conn):
+        """
+        Close the connection and remove it from the pool
+        """
+        try:
+            conn.close()
+        except MySQLdb.Error:
+            pass
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def getMaxSize(self):
+        return self._maxsize
+
+    def getStats(self):
+        with self._cond:
+            return {
+                'size' : self._size,
+                'max_size' : self._maxsize,
+                'idle' : len(self._idle),
+                'in_use' : self._size - len(self._idle),
+                'hits' : self._hits,
+                'misses' : self._misses,
+                'reconnects' : self._reconnects,
+                'waits' : self._waits,
+                'wait_time' : self._wait_time,
+                'max_wait_time' : self._max_wait_time,
+            }
 
 class DatabaseConnection(object):
+    """
+    Connection to the database that can be shared by several threads.
+    Each query takes a connection from the pool and returns it right away.
+    A thread that modifies the database keeps its connection
+    (and the transaction) until it calls commit().
+    """
+
     def __init__(self, conffile = None):
         self._conffile = conffile
-        self._connect()
+        host, user, passwd, db, poolsize = _get_db_credentials(conffile)
+        _check_db_credentials(host, user, passwd, db)
+        self._pool = ConnectionPool((host, user, passwd, db), *poolsize)
+        # the connection held by the thread in a transaction
+        # and the connections held by its unfinished lazy queries
+        self._local = local()
 
     def __del__(self):
-        # if creating the database failed, then the attribute _conn
+        # if creating the database failed, then the attribute _pool
         # is not created either and we would get exception
         # in this destructor
-        if hasattr(self, '_conn') and not self._conn is None:
-            self._conn.close()
-        del self
-
-    def _connect(self):
-        self._conn, self._cursor = _database_connect(self._conffile)
-
-    def _execute(self, q):
+        if hasattr(self, '_pool'):
+            self._pool.close()
+
+    def _lazyConns(self):
+        conns = getattr(self._local, 'lazy', None)
+        if conns is None:
+            conns = self._local.lazy = set()
+        return conns
+
+    def _acquire(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        # if the unfinished lazy results of this thread hold all
+        # the connections of the pool, it would wait for itself forever
+        # (if other threads hold some, they give them back eventually)
+        lazy = self._lazyConns()
+        if len(lazy) >= self._pool.getMaxSize():
+            err('All {0} connections to the database are held by unfinished '
+                'lazy queries of this thread. Read them to the end or close them '
+                'before the next query, or raise pool_max in the database '
+                'configuration.'.format(len(lazy)))
+        return self._pool.acquire()
+
+    def _release(self, conn):
+        # do not return the connection in the middle of a transaction
+        if conn is not getattr(self._local, 'conn', None):
+            self._pool.release(conn)
+
+    def _execute(self, conn, q, args = None, many = False, write = False,
+                 cursorclass = None):
+        if write and getattr(self._local, 'conn', None) is None:
+            # start a transaction that lasts until commit()
+            conn.autocommit(False)
+            self._local.conn = conn
+
+        cursor = conn.cursor(cursorclass)
         try:
-            self._cursor.execute(q)
+            if many:
+                cursor.executemany(q, args)
+            else:
+                cursor.execute(q, args)
         except MySQLdb.Error as e:
             print("Got exception: '{0}'".format(str(e)))
             print("While executing query  {0}".format(str(q)))
-            print("args: '{0}'".format(e.args))
-            print("args[0]: '{0}'".format(e.args[0]))
-            if e.args[0] == 2006: # "MySQL server has gone away"
-                print("Connection closed, sending ping to re-establish")
-                # NOTE: this can do rollback, but if the connection
-                # is down, we probably don't care
-                self._conn.ping(True)
-                if self._conn.open == 0:
-                    print("Ping didn't work, reconnecting")
-                    self._connect()
-
-                assert self._conn.open == 1
+            if isinstance(e, MySQLdb.OperationalError) and not conn.open:
+                # the connection is gone, together with any transaction
+                self._local.conn = None
+                self._pool.discard(conn)
             else:
-                print("Reraising exception")
-                # different exception, re-raise it
-                raise e
+                self._release(conn)
+            raise e
 
-    def query_unchecked(self, q):
+        return cursor
+
+    def _fetch(self, q, fetch, args = None, write = False):
+        conn = self._acquire()
+        cursor = self._execute(conn, q, args, write = write)
+        try:
+            return fetch(cursor)
+        finally:
+            cursor.close()
+            self._release(conn)
+
+    def query_unchecked(self, q, args = None):
         """
         Execute a query on the database and return an array with the result.
+        'args' are the values for %s placeholders in the query (if any).
         Throws MySQLdb.Error exception if the query fails.
         """
-        self._execute(q)
-        return self._cursor.fetchall()
+        return self._fetch(q, lambda c: c.fetchall(), args)
 
     def query_noresult(self, q):
         """
         Execute a query on the database. Do not execept any result.
+        The database is not actually modified until commit() is called.
         Throws MySQLdb.Error exception if the query fails.
         """
-        self._execute(q)
+        self._fetch(q, lambda c: None, write = True)
+
+    def query_many(self, q, rows):
+        """
+        Execute a parametrized query (using %s placeholders) once for
+        every tuple of parameters in 'rows'. INSERT queries are sent
+        as a single multi-row INSERT. The database is not actually
+        modified until commit() is called. Abort if the query fails.
+        """
+        try:
+            conn = self._acquire()
+            cursor = self._execute(conn, q, rows, many = True, write = True)
+            cursor.close()
+            self._release(conn)
+        except MySQLdb.Error as e:
+            err('Failed querying db: {0}\n\n{1}'.format(e.args[1], q))
 
     def queryInt(self, q):
         """
@@ -113,38 +389,63 @@ class DatabaseConnection(object):
         as an int. Abort if the query fails.
         """
 
+        def fetchInt(cursor):
+            ret = cursor.fetchone()
+            assert cursor.fetchone() is None
+            return ret
+
         try:
-            self._execute(q)
-            ret = self._cursor.fetchone()
-            assert self._cursor.fetchone() is None
+            ret = self._fetch(q, fetchInt)
         except MySQLdb.Error as e:
             err('Failed querying db: {0}\n\n{1}'.format(e.args[1], q))
 
         if not ret is None:
             return int(ret[0])
 
-    def query(self, q):
+    def query(self, q, args = None):
         """
         Execute a query on the database and return an array with the result.
-        Abort if the query fails. The database is not actually modified
-        until commit() is called.
+        'args' are the values for %s placeholders in the query (if any).
+        Abort if the query fails.
         """
         try:
-            return self.query_unchecked(q)
+            return self.query_unchecked(q, args)
         except MySQLdb.Error as e:
             err('Failed querying db: {0}\n\n{1}'.format(e.args[1], q))
 
-    def query_lazy(self, q):
+    def query_lazy(self, q, args = None, batch_size = 1000):
         """
-        Execute a query on the database and return a QueryResult object.
-        The query result object has iterators that can be used
-        to iterate over results in lazy manners. Aborts if the query fails.
+        Execute a query on the database and return a QueryResult object
+        that iterates over the result. The rows are read from the server
+        by 'batch_size' as the iteration goes on, so the whole result
+        is never held in memory.
+        The connection stays busy until the QueryResult is read to the end
+        or closed. Other queries of this thread meanwhile take another
+        connection from the pool (waiting for one as usual), but they abort
+        if the unfinished lazy results of this thread hold all the connections
+        of the pool (pool_max), as nothing would ever give one back.
+        In a transaction, the QueryResult must be finished before
+        the next query, as all queries use the connection of the transaction.
+        Aborts if the query fails.
         """
+        conn = self._acquire()
         try:
-            return QueryResult(self._cursor)
+            cursor = self._execute(conn, q, args, cursorclass = SSCursor)
         except MySQLdb.Error as e:
             err('Failed querying db: {0}\n\n{1}'.format(e.args[1], q))
 
+        if conn is getattr(self._local, 'conn', None):
+            return QueryResult(cursor, lambda: None, batch_size)
+
+        lazy = self._lazyConns()
+        lazy.add(conn)
+
+        def release():
+            lazy.discard(conn)
+            self._pool.release(conn)
+
+        return QueryResult(cursor, release, batch_size)
+
     def query_with_exception_handler(self, q, handler, data):
         """
         Execute a query on the database and return an array with the result.
@@ -161,7 +462,39 @@ class DatabaseConnection(object):
         """
         Commit database's state
         """
-        self._conn.commit()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # nothing was modified by this thread
+            return
+
+        self._local.conn = None
+        try:
+            conn.commit()
+            conn.autocommit(True)
+        except MySQLdb.Error:
+            self._pool.discard(conn)
+            raise
+        self._pool.release(conn)
+
+    def rollback(self):
+        """
+        Throw away the changes of this thread that were not committed yet
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+
+        self._local.conn = None
+        try:
+            conn.rollback()
+            conn.autocommit(True)
+        except MySQLdb.Error:
+            self._pool.discard(conn)
+            return
+        self._pool.release(conn)
+
+    def getPoolStats(self):
+        return self._pool.getStats()
 
 def _get_db_credentials(path):
     absp = abspath(path)
@@ -174,10 +507,12 @@ def _get_db_credentials(path):
     user = None
     db = None
     pw = None
+    pool_min = 1
+    pool_max = 8
 
     for l in f:
-        l = l.lstrip()
-        if l[0] == '#':
+        l = l.strip()
+        if not l or l[0] == '#':
             continue
 
         k,v = l.split('=', 1)
@@ -192,12 +527,19 @@ def _get_db_credentials(path):
             pw = v
         elif k == 'database':
             db = v
+        elif k == 'pool_min':
+            pool_min = int(v)
+        elif k == 'pool_max':
+            pool_max = int(v)
         else:
             err('Unknown key in {0}: \'{1}\''.format(absp, k))
 
     f.close()
 
-    return host, user, pw, db
+    if pool_max < 1 or pool_min < 0 or pool_min > pool_max:
+        err('Invalid size of the connection pool in {0}: {1}-{2}'.format(absp, pool_min, pool_max))
+
+    return host, user, pw, db, (pool_min, pool_max)
 
 def _check_db_credentials(host, user, passwd, db):
     if host is None or host == '':
@@ -208,16 +550,3 @@ def _check_db_credentials(host, user, passwd, db):
         err('Missing \'password\' for database')
     if db is None or db == '':
         err('Missing \'database\' for database')
-
-def _database_connect(conffile):
-    host, user, passwd, db = _get_db_credentials(conffile)
-    _check_db_credentials(host, user, passwd, db)
-
-    try:
-        conn = MySQLdb.connect(host = host, user = user,
-                               passwd = passwd, db = db)
-        cursor = conn.cursor()
-    except MySQLdb.Error as e:
-        err('{0}\n'.format(str(e)))
-
-    return conn, cursor
@@ -0,0 +1,203 @@
+from .. utils import err
+from . proxy import DatabaseProxy
+
+import MySQLdb
+
+# MySQL commits DDL statements (CREATE, ALTER) right away, so a migration
+# that fails in the middle cannot be rolled back. Therefore every step
+# of a migration can be run again: it either does not change anything
+# when repeated (CREATE TABLE IF NOT EXISTS, UPDATE, INSERT IGNORE) or
+# it is a pair (query, check) and it is skipped if the check query
+# returns a non-zero count (the step was done by an interrupted migration).
+
+def _unlessIndex(table, index, q):
+    return (q, """
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = '{0}'
+              AND index_name = '{1}';
+        """.format(table, index))
+
+def _unlessColumn(table, column, q):
+    return (q, """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = '{0}'
+              AND column_name = '{1}';
+        """.format(table, column))
+
+def _unlessRows(table, q):
+    return (q, 'SELECT COUNT(*) FROM {0};'.format(table))
+
+# List of migrations of the database scheme. Every migration is a triple
+# (version, description, list of steps). The versions must be increasing,
+# the database is at the version of the last applied migration.
+# database_scheme.sql creates the database at version 0.
+MIGRATIONS = [
+    (1, 'Add indexes for looking up runs of a tool run', [
+        _unlessIndex('run', 'run_tool_run_bset', """
+        CREATE INDEX run_tool_run_bset
+        ON run (tool_run_id, benchmarks_set_id);
+        """),
+        # 'file' is TEXT, so we can index only its prefix
+        _unlessIndex('run', 'run_tool_run_file', """
+        CREATE INDEX run_tool_run_file
+        ON run (tool_run_id, file(255));
+        """),
+    ]),
+    (2, 'Add table with precomputed statistics of tool runs', [
+        """
+        CREATE TABLE IF NOT EXISTS `tool_run_stats` (
+          `tool_run_id` int(11) NOT NULL,
+          `benchmarks_set_id` int(11) NOT NULL,
+          `status` varchar(255) DEFAULT NULL,
+          `classification` varchar(50) DEFAULT NULL,
+          `count` int(11) NOT NULL,
+          `cputime` double DEFAULT NULL,
+          `walltime` double DEFAULT NULL,
+          KEY `tool_run_stats_tool_run` (`tool_run_id`, `benchmarks_set_id`),
+          FOREIGN KEY (`tool_run_id`) REFERENCES `tool_run` (`id`),
+          FOREIGN KEY (`benchmarks_set_id`) REFERENCES `benchmarks_set` (`id`)
+        );
+        """,
+        _unlessRows('tool_run_stats', """
+        INSERT INTO tool_run_stats
+          (tool_run_id, benchmarks_set_id, status, classification,
+           count, cputime, walltime)
+        SELECT tool_run_id, benchmarks_set_id, status, classification,
+               count(classification), sum(cputime), sum(walltime)
+        FROM run
+        GROUP BY tool_run_id, benchmarks_set_id, classification, status;
+        """),
+    ]),
+    (3, 'Add table with files imported from watched directories', [
+        """
+        CREATE TABLE IF NOT EXISTS `imported_file` (
+          `path` varchar(1024) NOT NULL,
+          `size` bigint NOT NULL,
+          `mtime` double NOT NULL,
+          `sha256` char(64) NOT NULL,
+          `imported` DATETIME DEFAULT NULL,
+          KEY `imported_file_path` (`path`(255))
+        );
+        """,
+    ]),
+    (4, 'Add unique indexes for looking up tools, tool runs and benchmarks sets', [
+        _unlessIndex('tool', 'tool_name_version', """
+        CREATE UNIQUE INDEX tool_name_version
+        ON tool (name, version);
+        """),
+        _unlessIndex('benchmarks_set', 'benchmarks_set_name', """
+        CREATE UNIQUE INDEX benchmarks_set_name
+        ON benchmarks_set (name);
+        """),
+        # 'options' is TEXT, so we index its hash
+        _unlessColumn('tool_run', 'options_hash', """
+        ALTER TABLE tool_run
+        ADD COLUMN `options_hash` char(64) DEFAULT NULL;
+        """),
+        """
+        UPDATE tool_run
+        SET options_hash = SHA2(options, 256);
+        """,
+        _unlessIndex('tool_run', 'tool_run_config', """
+        CREATE UNIQUE INDEX tool_run_config
+        ON tool_run (tool_id, memlimit, cpulimit, options_hash);
+        """),
+    ]),
+    (5, 'Add ledger of imported xml files', [
+        """
+        CREATE TABLE IF NOT EXISTS `import_ledger` (
+          `sha256` char(64) NOT NULL,
+          `path` varchar(1024) DEFAULT NULL,
+          `tool_run_id` int(11) DEFAULT NULL,
+          `benchmarks_set_id` int(11) DEFAULT NULL,
+          `imported` DATETIME DEFAULT NULL,
+          PRIMARY KEY (`sha256`),
+          KEY `import_ledger_tool_run` (`tool_run_id`)
+        );
+        """,
+    ]),
+    (6, 'Add counter of changes of the results', [
+        """
+        CREATE TABLE IF NOT EXISTS `data_generation` (
+          `id` int(11) NOT NULL,
+          `generation` bigint NOT NULL,
+          `changed` DATETIME DEFAULT NULL,
+          PRIMARY KEY (`id`)
+        );
+        """,
+        """
+        INSERT IGNORE INTO data_generation (id, generation, changed)
+        VALUES (1, 0, NOW());
+        """,
+    ]),
+]
+
+class DatabaseMigrator(DatabaseProxy):
+    """
+    DatabaseProxy that brings the database scheme up to date
+    """
+
+    def __init__(self, conffile = None):
+        DatabaseProxy.__init__(self, conffile)
+
+    def _createVersionTable(self):
+        q = """
+        CREATE TABLE IF NOT EXISTS schema_version (
+          `version` int(11) NOT NULL,
+          `description` VARCHAR(255) DEFAULT NULL,
+          `applied` DATETIME DEFAULT NULL,
+          PRIMARY KEY (`version`)
+        );
+        """
+        self.query_noresult(q)
+        self.commit()
+
+    def getSchemaVersion(self):
+        self._createVersionTable()
+        ver = self.queryInt("SELECT max(version) FROM schema_version;")
+        return ver if ver else 0
+
+    def getPendingMigrations(self):
+        ver = self.getSchemaVersion()
+        return [m for m in MIGRATIONS if m[0] > ver]
+
+    def _applyStep(self, ver, step):
+        q, check = step if isinstance(step, tuple) else (step, None)
+        if check is not None and self.queryInt(check):
+            # done by a migration that failed later
+            return
+
+        try:
+            self.query_noresult(q)
+        except MySQLdb.Error as e:
+            err('Migration to version {0} failed: {1}\n\n{2}\n'
+                'Fix the problem and run the migration again, '
+                'the finished steps are skipped.'.format(ver, e.args[1], q))
+
+    def migrate(self):
+        """
+        Apply all migrations that were not applied yet.
+        Return the list of applied migrations.
+        """
+        applied = []
+        for (ver, descr, steps) in self.getPendingMigrations():
+            print('Migrating to version {0}: {1}'.format(ver, descr))
+            for step in steps:
+                self._applyStep(ver, step)
+
+            self.query_many("""
+            INSERT INTO schema_version (version, description, applied)
+            VALUES (%s, %s, NOW());
+            """, [(ver, descr)])
+            self.commit()
+            applied.append(ver)
+
+        return applied
+
+# entrypoint function
+def perform_migration(args):
+    migrator = DatabaseMigrator(args.db)
+    applied = migrator.migrate()
+    if applied:
+        print('Applied {0} migration(s)'.format(len(applied)))
+    print('Database scheme is at version {0}'.format(migrator.getSchemaVersion()))
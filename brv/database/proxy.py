@@ -52,15 +52,27 @@ class DatabaseProxy(object):
     def query_noresult(self, q):
         return self._db.query_noresult(q)
 
+    def query_many(self, q, rows):
+        return self._db.query_many(q, rows)
+
     def queryInt(self, q):
         return self._db.queryInt(q)
 
-    def query(self, q):
-        return self._db.query(q)
+    def query_lazy(self, q, args = None, batch_size = 1000):
+        return self._db.query_lazy(q, args, batch_size)
+
+    def query(self, q, args = None):
+        return self._db.query(q, args)
 
     def commit(self):
         self._db.commit()
 
+    def rollback(self):
+        self._db.rollback()
+
+    def getPoolStats(self):
+        return self._db.getPoolStats()
+
     def getRunCount(self, tool_run_id, bset_id):
         q = """
         SELECT count(*) FROM run
@@ -21,8 +21,13 @@
 
 from . proxy import DatabaseProxy
 from brv.bset import BSet
-from brv.toolrun import DBToolRun, ToolRunStats
-from brv.runinfo import DBRunInfo
+from brv.toolrun import DBToolRun, ToolRunStats, _comparable_name
+from brv.runinfo import RunInfoBlock
+from . comparison import comparisonHaving
+
+# SQL counterpart of _comparable_name: strip off the prefix
+# before the sv-benchmarks directory (LOCATE returns 0 if not found)
+_COMPARABLE_FILE = "SUBSTRING(file, GREATEST(LOCATE('sv-benchmarks', file), 1))"
 
 class DatabaseReader(DatabaseProxy):
     """
@@ -72,9 +77,9 @@ class DatabaseReader(DatabaseProxy):
 
     def getToolInfoStats(self, tool_run_id):
         q = """
-        SELECT name, status, classification, benchmarks_set_id, count(classification), sum(cputime)
-        FROM run JOIN benchmarks_set ON benchmarks_set_id = benchmarks_set.id
-        WHERE tool_run_id='{0}' GROUP BY classification, status, benchmarks_set_id;
+        SELECT name, status, classification, benchmarks_set_id, count, cputime
+        FROM tool_run_stats JOIN benchmarks_set ON benchmarks_set_id = benchmarks_set.id
+        WHERE tool_run_id='{0}';
          """.format(tool_run_id)
         res = self.query(q)
         ret = ToolRunStats()
@@ -90,6 +95,22 @@ class DatabaseReader(DatabaseProxy):
 
         return ret
 
+    def getDataGeneration(self):
+        """
+        Return the counter of changes of the results (see
+        DatabaseWriter.bumpDataGeneration) or None if the database
+        does not have it
+        """
+        def missing(args, data):
+            print('The database has no data generation ({0}), '
+                  'run \'./brv.py --migrate\''.format(args[1]))
+
+        res = self._db.query_with_exception_handler(
+                "SELECT generation FROM data_generation WHERE id = 1;", missing, None)
+        if res:
+            return int(res[0][0])
+        return None
+
     def getBenchmarksSets(self):
         q = """
         SELECT id, name FROM benchmarks_set;"""
@@ -97,7 +118,7 @@ class DatabaseReader(DatabaseProxy):
         ret = list(map(lambda x: BSet(x[1], x[0]), res))
         return ret
 
-    def getRunInfos(self, bset_id, tool_run_id):
+    def _lazyRunInfos(self, where, args, order = None):
         # 0 -> status
         # 1 -> cputime
         # 2 -> walltime
@@ -111,43 +132,139 @@ class DatabaseReader(DatabaseProxy):
         q = """
         SELECT status, cputime, walltime, memusage,
                classification, exitcode, property, file, prefix
-        FROM run WHERE tool_run_id = '{0}' AND benchmarks_set_id = '{1}';
-        """.format(tool_run_id, bset_id);
+        FROM run WHERE {0}
+        {1};
+        """.format(where, 'ORDER BY ' + order if order else '')
         print(q)
-        # FIXME: use fetchone
-        res = self.query(q)
-        ret = []
-        for r in res:
-            # FIXME: do this lazily -- return an object with this query
-            # and return DBRunInfo when iterating over this object
-            ret.append(DBRunInfo(r))
+        # the runs are read from the database as the caller iterates
+        # over them, closing the generator stops the query
+        with self.query_lazy(q, args) as res:
+            for rows in res.batches():
+                # a new block for every batch, so that the runs that
+                # the caller does not keep are freed
+                block = RunInfoBlock()
+                for r in rows:
+                    yield block.append(r)
 
-        return ret
+    def getRunInfos(self, bset_id, tool_run_id):
+        return self._lazyRunInfos('tool_run_id = %s AND benchmarks_set_id = %s',
+                                  (tool_run_id, bset_id))
 
     def getAllRunInfos(self, tool_run_id):
-        # 0 -> status
-        # 1 -> cputime
-        # 2 -> walltime
-        # 3 -> memusage
-        # 4 -> classification
-        # 5 -> exitcode
-        # 6 -> property
-        # 7 -> file name
-        # 8 -> prefix
+        return self._lazyRunInfos('tool_run_id = %s', (tool_run_id,), 'file ASC')
+
+    def getComparedRunInfos(self, tool_run_ids, bset_ids = None):
+        """
+        Return the runs of all the given tool runs (only in the given
+        benchmarks sets, if any) as triples (tool_run_id, benchmarks_set_id,
+        BlockRunInfo) using a single query. If 'bset_ids' are given,
+        the runs are ordered by benchmarks sets first. Then they are ordered
+        by the name of the benchmark (see _comparable_name) and the tool run,
+        so the results for one benchmark come one after another.
+        The runs are read lazily as in getRunInfos.
+        """
+        assert tool_run_ids
+
+        where = 'tool_run_id IN ({0})'.format(','.join(map(str, map(int, tool_run_ids))))
+        order = '{0}, tool_run_id'.format(_COMPARABLE_FILE)
+        if bset_ids is not None:
+            if not bset_ids:
+                return
+            where += ' AND benchmarks_set_id IN ({0})'.format(','.join(map(str, map(int, bset_ids))))
+            order = 'benchmarks_set_id, ' + order
 
         q = """
-        SELECT status, cputime, walltime, memusage,
+        SELECT tool_run_id, benchmarks_set_id,
+               status, cputime, walltime, memusage,
                classification, exitcode, property, file, prefix
-        FROM run WHERE tool_run_id = '{0}'
-        ORDER BY file ASC;
-        """.format(tool_run_id);
-        print(q)
-        # FIXME: use fetchone
-        res = self.query(q)
+        FROM run WHERE {0}
+        ORDER BY {1};
+        """.format(where, order)
+        with self.query_lazy(q) as res:
+            for rows in res.batches():
+                block = RunInfoBlock()
+                for r in rows:
+                    yield (r[0], r[1], block.append(r[2:]))
+
+    def _comparisonOrder(self, sort):
+        kind, run_id, descending = sort
+        if kind == 'cputime':
+            key = 'MAX(CASE WHEN tool_run_id = {0} THEN cputime END)'.format(int(run_id))
+        elif kind == 'status':
+            key = 'MAX(CASE WHEN tool_run_id = {0} THEN status END)'.format(int(run_id))
+        else:
+            assert kind == 'name'
+            # the name of the file without the path
+            key = "MIN(SUBSTRING_INDEX(file, '/', -1))"
+
+        order = 'DESC' if descending else 'ASC'
+        return '{0} {1}, name {1}'.format(key, order)
+
+    def getComparisonPage(self, bset_ids, tool_run_ids, sort,
+                          offset = 0, limit = None, filters = []):
+        """
+        Return a list of pairs (benchmarks_set_id, name) of the benchmarks
+        from the given benchmarks sets that were run by any of the tool runs.
+        The names are stripped of the prefix before the sv-benchmarks
+        directory, the same way as in RunInfosTable.
+        The benchmarks are ordered by the benchmarks set and then according
+        to 'sort', which is a triple (kind, tool_run_id, descending) where
+        kind is 'name', 'cputime' or 'status' (the latter two of the given
+        tool run). Only the benchmarks that pass all the 'filters'
+        (keys of COMPARISON_FILTERS in brv.database.comparison) are
+        returned and if 'limit' is given, only 'limit' benchmarks starting
+        at 'offset'.
+        """
+        assert bset_ids and tool_run_ids
+
+        limit_clause = ''
+        if limit is not None:
+            limit_clause = 'LIMIT {0} OFFSET {1}'.format(int(limit), int(offset))
+
+        q = """
+        SELECT benchmarks_set_id, {4} AS name
+        FROM run
+        WHERE tool_run_id IN ({0}) AND benchmarks_set_id IN ({1})
+        GROUP BY benchmarks_set_id, name
+        {5}
+        ORDER BY benchmarks_set_id, {2}
+        {3};
+        """.format(','.join(map(str, map(int, tool_run_ids))),
+                   ','.join(map(str, map(int, bset_ids))),
+                   self._comparisonOrder(sort), limit_clause, _COMPARABLE_FILE,
+                   comparisonHaving(filters, len(set(tool_run_ids))))
+        return [(r[0], r[1]) for r in self.query(q)]
+
+    def getComparisonRunInfos(self, tool_run_ids, benchmarks):
+        """
+        Return the results of the given tool runs on the given benchmarks
+        (a list of pairs (benchmarks_set_id, name) as returned by
+        getComparisonPage) as a list of triples
+        (tool_run_id, benchmarks_set_id, BlockRunInfo)
+        """
+        if not benchmarks:
+            return []
+
+        names = list(set(b[1] for b in benchmarks))
+        q = """
+        SELECT tool_run_id, benchmarks_set_id,
+               status, cputime, walltime, memusage,
+               classification, exitcode, property, file, prefix
+        FROM run
+        WHERE tool_run_id IN ({0}) AND benchmarks_set_id IN ({1})
+              AND {2} IN ({{0}});
+        """.format(','.join(map(str, map(int, tool_run_ids))),
+                   ','.join(set(str(int(b[0])) for b in benchmarks)),
+                   _COMPARABLE_FILE)
+
+        wanted = set(benchmarks)
+        block = RunInfoBlock()
         ret = []
-        for r in res:
-            # FIXME: do this lazily -- return an object with this query
-            # and return DBRunInfo when iterating over this object
-            ret.append(DBRunInfo(r))
+        # do not create too long queries when the whole listing is requested
+        for n in range(0, len(names), 1000):
+            chunk = names[n:n + 1000]
+            for r in self.query(q.format(','.join(['%s'] * len(chunk))), chunk):
+                if (r[1], _comparable_name(r[9])) in wanted:
+                    ret.append((r[0], r[1], block.append(r[2:])))
 
         return ret
@@ -25,6 +25,10 @@ from . proxy import DatabaseProxy
 def None2Null(s):
     return "'{0}'".format(s) if s else 'NULL'
 
+def Empty2None(s):
+    # the same as None2Null for the values passed as query parameters
+    return s if s else None
+
 def None2Empty(s):
     return "{0}".format(s) if s else ''
 
@@ -35,7 +39,44 @@ class DatabaseWriter(DatabaseProxy):
 
     def __init__(self, conffile = None):
         DatabaseProxy.__init__(self, conffile)
+        # IDs of the rows of the tables tool, tool_run and benchmarks_set
+        # by the values that identify them, loaded on the first use
+        self._tool_ids = None
+        self._tool_run_ids = None
+        self._benchmarks_set_ids = None
+        # whether the database has the table data_generation,
+        # checked on the first change
+        self._has_data_generation = None
+
+    def forgetIDs(self):
+        """
+        Read the IDs of tools, tool runs and benchmarks sets again when
+        they are needed. Other processes (the web interface) may delete
+        the rows, so a writer that lives longer than one transaction
+        must call this before the next one.
+        """
+        self._tool_ids = None
+        self._tool_run_ids = None
+        self._benchmarks_set_ids = None
 
+    def _loadIDs(self):
+        """
+        Read the IDs of all tools, tool runs and benchmarks sets,
+        so that importing does not need to look them up in the database
+        for every file. The tables are small.
+        """
+        if self._tool_ids is not None:
+            return
+
+        self._tool_ids = {(r[1], r[2]) : r[0] for r in
+                          self.query("SELECT id, name, version FROM tool;")}
+        self._tool_run_ids = {tuple(r[1:]) : r[0] for r in
+                              self.query("""
+                              SELECT id, tool_id, memlimit, cpulimit, options
+                              FROM tool_run;
+                              """)}
+        self._benchmarks_set_ids = {r[1] : r[0] for r in
+                                    self.query("SELECT id, name FROM benchmarks_set;")}
 
     def _getToolID(self, name, version):
         q = """
@@ -46,6 +87,14 @@ class DatabaseWriter(DatabaseProxy):
         return self.queryInt(q)
 
     def _getOrCreateToolID(self, toolinfo):
+        self._loadIDs()
+        key = (toolinfo.tool, toolinfo.tool_version)
+        tool_id = self._tool_ids.get(key)
+        if tool_id is not None:
+            return tool_id
+
+        # the values may differ only in the case or in trailing spaces
+        # (the database ignores these when comparing)
         tool_id = self._getToolID(toolinfo.tool, toolinfo.tool_version)
         if tool_id is None:
             # update the 'tool' table if needed
@@ -56,6 +105,7 @@ class DatabaseWriter(DatabaseProxy):
             self.query_noresult(q)
             tool_id = self.queryInt("SELECT LAST_INSERT_ID();")
 
+        self._tool_ids[key] = tool_id
         return tool_id
 
     def getOrCreateToolInfoID(self, toolinfo, outputs = None):
@@ -65,12 +115,18 @@ class DatabaseWriter(DatabaseProxy):
         """
 
         tool_id = self._getOrCreateToolID(toolinfo)
+        key = (tool_id, toolinfo.memlimit, toolinfo.timelimit, toolinfo.options)
+        tool_run_id = self._tool_run_ids.get(key)
+        if tool_run_id is not None:
+            return tool_run_id
 
+        # options are TEXT, the index is on their hash
         q = """
         SELECT id FROM tool_run WHERE
           tool_id = '{0}' AND
           memlimit = '{1}' AND
           cpulimit = '{2}' AND
+          options_hash = SHA2('{3}', 256) AND
           options = '{3}';
         """.format(tool_id, toolinfo.memlimit, toolinfo.timelimit,
                    toolinfo.options)
@@ -80,9 +136,9 @@ class DatabaseWriter(DatabaseProxy):
             # add a new tool_run record
             q = """
             INSERT INTO tool_run
-              (tool_id, options, memlimit, cpulimit, date,
+              (tool_id, options, options_hash, memlimit, cpulimit, date,
                description, outputs)
-              VALUES ('{0}', '{1}', '{2}', '{3}', '{4}', '{5}', {6});
+              VALUES ('{0}', '{1}', SHA2('{1}', 256), '{2}', '{3}', '{4}', '{5}', {6});
             """.format(tool_id, toolinfo.options,
                        toolinfo.memlimit, toolinfo.timelimit,
                        toolinfo.date,
@@ -92,9 +148,15 @@ class DatabaseWriter(DatabaseProxy):
             self.query_noresult(q)
             tool_run_id = self.queryInt("SELECT LAST_INSERT_ID();")
 
+        self._tool_run_ids[key] = tool_run_id
         return tool_run_id
 
     def getOrCreateBenchmarksSetID(self, name):
+        self._loadIDs()
+        benchmarks_id = self._benchmarks_set_ids.get(name)
+        if benchmarks_id is not None:
+            return benchmarks_id
+
         q = """
         SELECT id FROM benchmarks_set WHERE
             name = '{0}'
@@ -110,25 +172,147 @@ class DatabaseWriter(DatabaseProxy):
 
             benchmarks_id = self.queryInt("SELECT LAST_INSERT_ID();")
 
+        self._benchmarks_set_ids[name] = benchmarks_id
         return benchmarks_id
 
-    def writeRunInfo(self, tool_run_id, benchmarks_set_id, runinfo):
-        q = """
+    _INSERT_RUN = """
         INSERT INTO run
         (status, cputime, walltime, memusage, classification, exitcode, exitsignal,
          terminationreason, tool_run_id, benchmarks_set_id, property, options,
          file, prefix)
-        VALUES ('{0}', {1}, {2}, {3}, '{4}', {5}, '{6}', '{7}', '{8}', '{9}',
-        '{10}', '{11}', '{12}', '{13}');
-        """.format(runinfo.status(), None2Null(runinfo.cputime()), None2Null(runinfo.walltime()),
-                   None2Null(runinfo.memusage()), runinfo.classification(), None2Null(runinfo.exitcode()),
-                   0, 0, #FIXME
-                   tool_run_id, benchmarks_set_id,
-                   runinfo.property(), None, #FIXME
-                   runinfo.fullname(), runinfo.prefix())
-                    #FIXME: what return value?
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+        """
+
+    def _runInfoRow(self, tool_run_id, benchmarks_set_id, runinfo):
+        return (runinfo.status(), Empty2None(runinfo.cputime()), Empty2None(runinfo.walltime()),
+                Empty2None(runinfo.memusage()), runinfo.classification(),
+                Empty2None(runinfo.exitcode()),
+                0, 0, #FIXME
+                tool_run_id, benchmarks_set_id,
+                runinfo.property(), None, #FIXME
+                runinfo.fullname(), runinfo.prefix())
+
+    def writeRunInfo(self, tool_run_id, benchmarks_set_id, runinfo):
+        self.query_many(self._INSERT_RUN,
+                        [self._runInfoRow(tool_run_id, benchmarks_set_id, runinfo)])
+
+    def writeRunInfos(self, tool_run_id, benchmarks_set_id, runinfos,
+                      chunk_size = 1000):
+        """
+        Store the run infos from the iterable 'runinfos'. The runs are sent
+        to the database in chunks of 'chunk_size' rows (one multi-row INSERT
+        per chunk). The changes are not commited.
+        Return the number of stored runs.
+        """
+        assert chunk_size > 0
+
+        cnt = 0
+        chunk = []
+        for r in runinfos:
+            chunk.append(self._runInfoRow(tool_run_id, benchmarks_set_id, r))
+            if len(chunk) >= chunk_size:
+                self.query_many(self._INSERT_RUN, chunk)
+                cnt += len(chunk)
+                chunk = []
+
+        if chunk:
+            self.query_many(self._INSERT_RUN, chunk)
+            cnt += len(chunk)
+
+        return cnt
+
+    def updateToolRunStats(self, tool_run_id, benchmarks_set_id):
+        """
+        Recompute the statistics of the runs of the given tool run
+        on the given benchmarks set. Must be called whenever the runs change.
+        """
+        q = """
+        DELETE FROM tool_run_stats
+        WHERE tool_run_id = '{0}' AND benchmarks_set_id = '{1}';
+        """.format(tool_run_id, benchmarks_set_id)
+        self.query_noresult(q)
+
+        q = """
+        INSERT INTO tool_run_stats
+          (tool_run_id, benchmarks_set_id, status, classification,
+           count, cputime, walltime)
+        SELECT tool_run_id, benchmarks_set_id, status, classification,
+               count(classification), sum(cputime), sum(walltime)
+        FROM run
+        WHERE tool_run_id = '{0}' AND benchmarks_set_id = '{1}'
+        GROUP BY classification, status;
+        """.format(tool_run_id, benchmarks_set_id)
         self.query_noresult(q)
 
+    def getImportedFiles(self, directory):
+        """
+        Return a dictionary that maps the paths of the files imported
+        from the given directory to triples (size, mtime, sha256)
+        """
+        # escape the wildcards of LIKE in the path
+        pattern = directory.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        res = self.query("""
+        SELECT path, size, mtime, sha256 FROM imported_file
+        WHERE path LIKE %s;
+        """, (pattern.rstrip('/') + '/%',))
+        return {r[0] : (r[1], r[2], r[3]) for r in res}
+
+    def setImportedFile(self, path, size, mtime, sha256):
+        """
+        Remember that the file with the given size, modification time
+        and hash of the content was imported
+        """
+        self.query_many("DELETE FROM imported_file WHERE path = %s;", [(path,)])
+        self.query_many("""
+        INSERT INTO imported_file (path, size, mtime, sha256, imported)
+        VALUES (%s, %s, %s, %s, NOW());
+        """, [(path, size, mtime, sha256)])
+
+    def bumpDataGeneration(self):
+        """
+        Let the web interface know that the results changed
+        (the pages it sent before are not valid anymore).
+        Does nothing if the database is not migrated yet, the same
+        as DatabaseReader.getDataGeneration.
+        """
+        if self._has_data_generation is None:
+            self._has_data_generation = self.queryInt("""
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = 'data_generation';
+            """) > 0
+            if not self._has_data_generation:
+                print('The database has no data generation, '
+                      'run \'./brv.py --migrate\'')
+        if not self._has_data_generation:
+            return
+
+        self.query_noresult("""
+        UPDATE data_generation
+        SET generation = generation + 1, changed = NOW()
+        WHERE id = 1;
+        """)
+
+    def getImportLedger(self):
+        """
+        Return the set of hashes of the imported xml files
+        """
+        return set(r[0] for r in self.query("SELECT sha256 FROM import_ledger;"))
+
+    def addToImportLedger(self, sha256, path, tool_run_id = None, benchmarks_set_id = None):
+        """
+        Remember that the xml file with the given hash of the (decompressed)
+        content was imported (its results are in the given tool run
+        and benchmarks set)
+        """
+        self.query_many("""
+        INSERT INTO import_ledger
+          (sha256, path, tool_run_id, benchmarks_set_id, imported)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+          path = VALUES(path), tool_run_id = VALUES(tool_run_id),
+          benchmarks_set_id = VALUES(benchmarks_set_id), imported = NOW();
+        """, [(sha256, path, tool_run_id, benchmarks_set_id)])
+
     def setToolRunDescr(self, tool_run_id, descr):
         q = """
         UPDATE tool_run
@@ -146,12 +330,27 @@ class DatabaseWriter(DatabaseProxy):
         res = self.query_noresult(q)
 
     def deleteTool(self, tool_run_id):
+        self.forgetIDs()
+
         q = """
         DELETE FROM run
         WHERE tool_run_id = '{0}';
         """.format(tool_run_id)
         self.query_noresult(q)
 
+        q = """
+        DELETE FROM tool_run_stats
+        WHERE tool_run_id = '{0}';
+        """.format(tool_run_id)
+        self.query_noresult(q)
+
+        # the files of the tool run can be imported again
+        q = """
+        DELETE FROM import_ledger
+        WHERE tool_run_id = '{0}';
+        """.format(tool_run_id)
+        self.query_noresult(q)
+
         # get tool id so that we can remove it if this was the last tool run
         q = """
         SELECT tool_id FROM tool_run
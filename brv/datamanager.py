@@ -1,24 +1,47 @@
 from brv.toolsmanager import ToolsManager
 from brv.tagsmanager import TagsManager
-from brv.toolrun import RunInfosTable
+from brv.toolrun import RunInfosTable, _comparable_name, _tool_run_columns
 from brv.groupingmanager import GroupingManager
 from brv.scoringmanager import ScoringManager
 
+from threading import RLock
+from collections import OrderedDict
+from itertools import groupby
+from time import time
+
+# how often (in seconds) we look into the database
+# whether some results were imported
+GENERATION_CHECK_INTERVAL = 2.0
+
 class DataManager(object):
     """
     Instance of this class manages all data (either from xml
     or database) that we know about, so this is the top
-    class wrapping all retrieved data
+    class wrapping all retrieved data.
+    The object is shared by all threads of the server, the tools
+    and tags managers are modified only while holding the lock.
     """
 
     def __init__(self, db_conf = None, xmls = []):
+        self._lock = RLock()
         self.toolsmanager = ToolsManager()
         self.tagsmanager = TagsManager()
         self.groupingmanager = GroupingManager()
         self.scoringmanager = ScoringManager()
         self._db_reader = None
+        self._db_writer = None
         self._db_config = db_conf
 
+        # the generation of the data: the server start, the number of
+        # changes done by the server and the counter of changes
+        # in the database (imports), see getDataGeneration()
+        self._started = int(time())
+        self._changes = 0
+        self._db_generation = None
+        self._db_generation_checked = 0
+        self._db_generation_missing = False
+        self._modified = time()
+
         if db_conf:
             from brv.database.connection import DatabaseConnection
             from brv.database.reader import DatabaseReader
@@ -41,17 +64,21 @@ class DataManager(object):
         print('Reloading data from DB')
 
         tool_runs = self._db_reader.getToolRuns()
-        self.toolsmanager.reset()
-        self.tagsmanager.reset()
-        for run in tool_runs:
-            self.toolsmanager.add(run)
-            self.tagsmanager.addToolRunTags(run)
+        with self._lock:
+            self._changed()
+            self.toolsmanager.reset()
+            self.tagsmanager.reset()
+            for run in tool_runs:
+                self.toolsmanager.add(run)
+                self.tagsmanager.addToolRunTags(run)
 
     def getTools(self):
-        return self.toolsmanager.getTools()
+        with self._lock:
+            return list(self.toolsmanager.getTools())
 
     def getToolRuns(self, which = []):
-        return self.toolsmanager.getToolRuns(which)
+        with self._lock:
+            return list(self.toolsmanager.getToolRuns(which))
 
     def getToolInfoStats(self, which):
         return self._db_reader.getToolInfoStats(which)
@@ -59,36 +86,79 @@ class DataManager(object):
     def getBenchmarksSets(self):
         return self._db_reader.getBenchmarksSets()
 
-    def getRunInfos(self, bset_id, toolruns_id):
-        table = RunInfosTable()
-        for tid in toolruns_id:
-            table.add(self._db_reader.getRunInfos(bset_id, tid))
+    def getRunInfosBySets(self, bset_ids, toolruns_id):
+        """
+        Generate pairs (bset_id, RunInfosTable) for the given benchmarks
+        sets that have some results of the given tool runs.
+        All the tables are read by one query.
+        """
+        runs = self._db_reader.getComparedRunInfos(toolruns_id, bset_ids)
+        for (bset_id, bset_runs) in groupby(runs, key = lambda r: r[1]):
+            yield (bset_id, RunInfosTable.fromRuns(((r[0], r[2]) for r in bset_runs),
+                                                   toolruns_id))
 
-        return table
+    def getRunInfosPage(self, bset_ids, toolruns_id, sort,
+                        offset = 0, limit = None, filters = []):
+        """
+        Return one page of the comparison of the given tool runs on
+        the given benchmarks sets as a pair (rows, has_next). 'rows' is
+        a list of triples (bset_id, benchmark name, list of runinfos)
+        where the list has one item for each tool run (None if the tool run
+        has no result for the benchmark). See DatabaseReader.getComparisonPage
+        for the meaning of the arguments.
+        """
+        if limit is None:
+            benchmarks = self._db_reader.getComparisonPage(bset_ids, toolruns_id, sort,
+                                                           filters = filters)
+            has_next = False
+        else:
+            # get one more benchmark to find out if there is the next page
+            benchmarks = self._db_reader.getComparisonPage(bset_ids, toolruns_id, sort,
+                                                           offset, limit + 1, filters)
+            has_next = len(benchmarks) > limit
+            benchmarks = benchmarks[:limit]
+
+        columns = _tool_run_columns(toolruns_id)
+        rows = OrderedDict((b, [None] * len(toolruns_id)) for b in benchmarks)
+        for (tid, bset_id, info) in self._db_reader.getComparisonRunInfos(toolruns_id, benchmarks):
+            infos = rows[(bset_id, _comparable_name(info.fullname()))]
+            for n in columns[tid]:
+                infos[n] = info
+
+        return [(b[0], b[1], infos) for (b, infos) in rows.items()], has_next
 
-    def getAllRunInfos(self, toolruns_id):
-        table = RunInfosTable()
-        for tid in toolruns_id:
-            table.add(self._db_reader.getAllRunInfos(tid))
+    def getToolRunTags(self, run):
+        with self._lock:
+            return list(self.tagsmanager.getToolRunTags(run))
 
-        return table
+    def getTags(self):
+        with self._lock:
+            return list(self.tagsmanager.getTags())
 
-    def getToolRunTags(self, run):
-        return self.tagsmanager.getToolRunTags(run)
+    def reloadTags(self):
+        with self._lock:
+            self._changed()
+            self.tagsmanager.reloadTags()
 
     def deleteToolRuns(self, runs):
-        for run in runs:
-            self._db_writer.deleteTool(run.getID())
-            self.toolsmanager.remove(run)
-            self.tagsmanager.remove(run)
-        self._db_writer.commit()
+        with self._lock:
+            for run in runs:
+                self._db_writer.deleteTool(run.getID())
+                self.toolsmanager.remove(run)
+                self.tagsmanager.remove(run)
+            self._db_writer.bumpDataGeneration()
+            self._db_writer.commit()
+            self._changed()
 
     def _updateToolRun(self, newrun):
-        self.toolsmanager.updateToolRun(newrun)
-        self.tagsmanager.setToolRunTags(newrun)
+        with self._lock:
+            self._changed()
+            self.toolsmanager.updateToolRun(newrun)
+            self.tagsmanager.setToolRunTags(newrun)
 
     def setToolRunDescription(self, run_id, descr):
         self._db_writer.setToolRunDescr(run_id, descr)
+        self._db_writer.bumpDataGeneration()
         self._db_writer.commit()
         # get the updated tool run (we could change it just loacally,
         # but until it is some efficiency issue, this is better for debugging
@@ -97,11 +167,63 @@ class DataManager(object):
 
     def setToolRunTags(self, run_id, tags):
         self._db_writer.setToolRunTags(run_id, tags)
+        self._db_writer.bumpDataGeneration()
         self._db_writer.commit()
 
         newrun = self._db_reader.getToolRun(run_id)
         self._updateToolRun(newrun)
 
+    def rollback(self):
+        """
+        Throw away the unfinished changes of the database
+        done by this thread (e.g., after a failed query)
+        """
+        if self._db_writer is not None:
+            self._db_writer.rollback()
+
+    def _changed(self):
+        with self._lock:
+            self._changes += 1
+            self._modified = time()
+
+    def getDataGeneration(self):
+        """
+        Return the pair (tag, time) where the tag is a string that changes
+        whenever the data shown by the server may change and time
+        is when we noticed the last change. The changes done by other
+        processes (imports) are noticed after at most
+        GENERATION_CHECK_INTERVAL seconds, the database is not queried
+        more often.
+        """
+        now = time()
+        with self._lock:
+            check = self._db_reader is not None and not self._db_generation_missing and\
+                    now - self._db_generation_checked >= GENERATION_CHECK_INTERVAL
+            if check:
+                self._db_generation_checked = now
+
+        if check:
+            generation = self._db_reader.getDataGeneration()
+            with self._lock:
+                if generation is None:
+                    # the database is not migrated, do not try again
+                    self._db_generation_missing = True
+                elif generation != self._db_generation:
+                    if self._db_generation is not None:
+                        self._modified = now
+                    self._db_generation = generation
+
+        with self._lock:
+            tag = '{0}-{1}-{2}'.format(self._started, self._changes, self._db_generation)
+            return tag, self._modified
+
+    def getDBStats(self):
+        """
+        Return a dictionary with counters of the pool of connections
+        to the database
+        """
+        return self._db_reader.getPoolStats()
+
     def getGroupingChoices(self):
         return self.groupingmanager.getGroupingChoices()
 
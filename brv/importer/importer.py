@@ -1,3 +1,7 @@
+from time import time
+
+from . xml import throughput
+
 def create_importer(args):
     if args.results_dir:
         return add_from_dir
@@ -8,25 +12,25 @@ def create_importer(args):
 
     return None
 
-def create_parser(config_file):
+def create_parser(args):
     from brv.xml.parser import XMLParser
-    parser = XMLParser(config_file)
+    parser = XMLParser(args.db, chunk_size = args.batch_size, jobs = args.jobs)
     return parser
 
 def add_from_dir(args):
     from brv.importer.dir import load_dir
-    parser = create_parser(args.db)
+    parser = create_parser(args)
     return load_dir(parser, args.results_dir, args.description, args.append_vers, args.allow_duplicates)
 
 def add_from_files(args):
     from brv.importer.xml import load_xmls
-    parser = create_parser(args.db)
+    parser = create_parser(args)
     return load_xmls(parser, args.files, args.outputs, args.description,
                       args.append_vers, args.allow_duplicates)
 
 def add_from_svcomp(args):
     from brv.importer.svcomp import load_svcomp
-    parser = create_parser(args.db)
+    parser = create_parser(args)
     return load_svcomp(parser, args.svcomp, args.description, args.append_vers, args.allow_duplicates)
 
 def tag_runs(toolrun_ids, args):
@@ -72,12 +76,52 @@ def copy_outputs(outputs, args):
             print('Copied the output: {0}'.format(outfile))
 
 
+def is_schema_up_to_date(args):
+    from brv.database.migrations import DatabaseMigrator
+    if DatabaseMigrator(args.db).getPendingMigrations():
+        print('The database scheme is not up to date, run \'./brv.py --migrate\' first')
+        return False
+    return True
+
 # entrypoint function
 def perform_import(args):
+    if args.jobs < 1:
+        print('The number of jobs must be positive')
+        return
+
+    if not is_schema_up_to_date(args):
+        return
+
     importer = create_importer(args)
+    start = time()
     total, toolrun_ids, outputs = importer(args)
+    elapsed = time() - start
 
-    print('Added {0} results in total'.format(total))
+    print('Added {0} results in total ({1})'.format(total, throughput(total, elapsed)))
     tag_runs(toolrun_ids, args)
     outputs = set(outputs)
     copy_outputs(outputs, args)
+
+# entrypoint function
+def perform_watch(args):
+    if args.jobs < 1:
+        print('The number of jobs must be positive')
+        return
+
+    if not is_schema_up_to_date(args):
+        return
+
+    from brv.xml.parser import XMLParser
+    from brv.importer.watch import watch_dir
+    # the files that appear together are committed at once
+    parser = XMLParser(args.db, chunk_size = args.batch_size, jobs = args.jobs,
+                       autocommit = False)
+
+    def imported(total, toolrun_ids, outputs):
+        tag_runs(toolrun_ids, args)
+        copy_outputs(set(outputs), args)
+
+    try:
+        watch_dir(parser, args.watch, args.append_vers, args.allow_duplicates, imported)
+    except KeyboardInterrupt:
+        print('Stopped watching {0}'.format(args.watch))
@@ -0,0 +1,228 @@
+from .. utils import hashFile
+from . dir import isResultFile, load_files
+from . xml import throughput
+
+import os
+from time import time, sleep
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    # the directory is polled instead
+    INotify = None
+
+# seconds without changes in the directory after which the new files
+# are imported (benchexec writes several files when a run finishes)
+DEBOUNCE = 2.0
+# seconds between listing the directory if inotify is not available
+POLL_INTERVAL = 5.0
+
+def _isWatchedFile(name):
+    # the importer needs at least 'tool.date.X.description' in the name
+    return isResultFile(name) and len(name.split('.')) > 3
+
+def _stat(path):
+    """
+    Return the pair (size, mtime) of the file or None if it does not exist
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime
+
+def _scan(path):
+    ret = {}
+    for name in os.listdir(path):
+        if _isWatchedFile(name):
+            st = _stat(os.path.join(path, name))
+            if st is not None:
+                ret[name] = st
+    return ret
+
+class _PollingWatcher(object):
+    """
+    Reports the files in the directory that were created or modified
+    by comparing the listings of the directory
+    """
+
+    def __init__(self, path, interval = POLL_INTERVAL):
+        self._path = path
+        self._interval = interval
+        self._files = _scan(path)
+
+    def wait(self, timeout = None):
+        """
+        Wait at most 'timeout' seconds (or forever if it is None)
+        and return the names of the changed files
+        """
+        sleep(self._interval if timeout is None else min(timeout, self._interval))
+        files = _scan(self._path)
+        changed = [name for (name, st) in files.items() if self._files.get(name) != st]
+        self._files = files
+        return changed
+
+class _InotifyWatcher(object):
+    """
+    Reports the files in the directory that were written or moved there
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._inotify = INotify()
+        self._inotify.add_watch(path, flags.CLOSE_WRITE | flags.MOVED_TO)
+
+    def wait(self, timeout = None):
+        events = self._inotify.read(timeout = None if timeout is None else int(timeout * 1000))
+        changed = []
+        for e in events:
+            if e.mask & flags.Q_OVERFLOW:
+                # we lost some events, look at all the files
+                return list(_scan(self._path).keys())
+            if _isWatchedFile(e.name):
+                changed.append(e.name)
+        return changed
+
+def _createWatcher(path):
+    if INotify is None:
+        print('inotify_simple is not installed, polling {0} every {1} s'.format(path, POLL_INTERVAL))
+        return _PollingWatcher(path)
+    return _InotifyWatcher(path)
+
+class DirectoryImporter(object):
+    """
+    Imports the new and modified files from the directory. The files
+    that were imported are stored in the database together with their
+    size, modification time and hash, so that they are not imported
+    again (e.g., after a restart). All the files imported at once
+    are stored in a single transaction.
+    """
+
+    def __init__(self, xmlparser, path, append_vers = None, allow_duplicates = False):
+        self._parser = xmlparser
+        self._writer = xmlparser.getDBWriter()
+        self._path = os.path.abspath(path)
+        self._append_vers = append_vers
+        self._allow_duplicates = allow_duplicates
+        # path -> (size, mtime, sha256)
+        self._imported = self._writer.getImportedFiles(self._path)
+        # archives with outputs whose results were not imported yet
+        self._waiting_outputs = set()
+
+    def _newFiles(self, names):
+        """
+        Return the triples (name, (size, mtime), sha256) of the files
+        from 'names' that were not imported yet. The files are hashed only
+        if their size or modification time changed.
+        """
+        new = []
+        for name in sorted(set(names)):
+            path = os.path.join(self._path, name)
+            st = _stat(path)
+            if st is None:
+                continue
+            known = self._imported.get(path)
+            if known and known[:2] == st:
+                continue
+
+            digest = hashFile(path)
+            if known and known[2] == digest:
+                # only touched, just remember the new modification time
+                self._remember(name, st, digest)
+                continue
+
+            new.append((name, st, digest))
+
+        return new
+
+    def _remember(self, name, st, digest):
+        path = os.path.join(self._path, name)
+        self._writer.setImportedFile(path, st[0], st[1], digest)
+        self._imported[path] = (st[0], st[1], digest)
+
+    def importFiles(self, names):
+        """
+        Import the given files of the directory (the files that were
+        imported before are skipped). Return the triple
+        (count, tool_run_ids, outputs) like load_dir() does.
+        """
+        # tool runs may have been deleted since the last import
+        self._writer.forgetIDs()
+        self._parser.forgetImportLedger()
+
+        new = self._newFiles(names)
+        if not new:
+            self._parser.commit()
+            return 0, [], []
+
+        print('Importing {0} new file(s) from {1}'.format(len(new), self._path))
+        files = [n[0] for n in new] + list(self._waiting_outputs)
+        total, toolrun_ids, outputs = load_files(self._parser, self._path, files,
+                                                 self._append_vers, self._allow_duplicates)
+
+        used = set(map(os.path.basename, outputs))
+        for (name, st, digest) in new:
+            # keep the outputs until the results they belong to are imported
+            if name.endswith('.zip') and name not in used:
+                self._waiting_outputs.add(name)
+            else:
+                self._remember(name, st, digest)
+        for name in (used & self._waiting_outputs) - set(n[0] for n in new):
+            path = os.path.join(self._path, name)
+            st = _stat(path)
+            if st is not None:
+                self._remember(name, st, hashFile(path))
+        self._waiting_outputs -= used
+
+        # the results and the list of imported files at once
+        self._parser.commit()
+        return total, toolrun_ids, outputs
+
+def watch_dir(xmlparser, path, append_vers = None, allow_duplicates = False,
+              on_import = None):
+    """
+    Import the results from the directory and keep importing the new
+    results as they appear. Files are imported when there were
+    no changes in the directory for DEBOUNCE seconds.
+    'on_import' is called with the triple (count, tool_run_ids, outputs)
+    after every import. Runs until interrupted.
+    """
+    importer = DirectoryImporter(xmlparser, path, append_vers, allow_duplicates)
+    watcher = _createWatcher(path)
+    print('Watching {0} for new results'.format(path))
+
+    # name of the file -> (size, mtime) when it was seen,
+    # the files found at the start are imported like new files
+    pending = _scan(path)
+    last_change = time()
+
+    while True:
+        timeout = None
+        if pending:
+            timeout = max(0, last_change + DEBOUNCE - time())
+
+        changed = watcher.wait(timeout)
+        if changed:
+            for name in changed:
+                pending[name] = _stat(os.path.join(path, name))
+            last_change = time()
+            continue
+
+        if not pending or time() < last_change + DEBOUNCE:
+            continue
+
+        # some file may still be written without us being notified
+        # (when polling), wait until nothing changes
+        current = {name : _stat(os.path.join(path, name)) for name in pending}
+        if current != pending:
+            pending = current
+            last_change = time()
+            continue
+
+        start = time()
+        res = importer.importFiles([name for (name, st) in pending.items() if st is not None])
+        pending = {}
+        if res[0] > 0:
+            print('Imported {0} results ({1})'.format(res[0], throughput(res[0], time() - start)))
+        if on_import:
+            on_import(*res)
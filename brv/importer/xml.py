@@ -1,14 +1,22 @@
+def throughput(cnt, elapsed):
+    """
+    Return a string describing how many runs per second were imported
+    """
+    if elapsed <= 0:
+        return '{0} runs in 0.00 s'.format(cnt)
+    return '{0:.0f} runs/s, {1:.2f} s'.format(cnt / elapsed, elapsed)
+
 def load_xmls(xmlparser, xmls, outputs = None, descr = None,
               append_vers = None, allow_duplicates = False):
 
     toolrun_ids = []
     total = 0
-    for xmlfile in xmls:
-        print('Parsing: {0}'.format(xmlfile))
-        cnt, run_ids = xmlparser.parseToDB(xmlfile, outputs, descr, append_vers, allow_duplicates)
-        print('Got {0} results from {1}'.format(cnt, xmlfile))
+    results = xmlparser.parseFilesToDB(xmls, outputs, descr, append_vers, allow_duplicates)
+    for (xmlfile, (cnt, run_ids), elapsed) in results:
+        print('Parsed: {0}'.format(xmlfile))
+        print('Got {0} results from {1} ({2})'.format(cnt, xmlfile,
+                                                     throughput(cnt, elapsed)))
         total += cnt
         toolrun_ids.extend(run_ids)
 
     return total, toolrun_ids, outputs if outputs is not None else []
-
@@ -1,4 +1,6 @@
 from os.path import basename
+from array import array
+from math import isnan
 
 class RunInfo(object):
     """
@@ -6,6 +8,9 @@ class RunInfo(object):
     of a tool on a given benchmark.
     """
 
+    # there are many instances of runinfos, do not give them __dict__
+    __slots__ = ()
+
     def name(self):
         return basename(self.fullname())
 
@@ -58,6 +63,8 @@ class DBRunInfo(RunInfo):
     using the getters
     """
 
+    __slots__ = ('_query_result',)
+
     def __init__(self, res):
         self._query_result = res
         assert self.fullname() != ''
@@ -109,6 +116,10 @@ class DirectRunInfo(RunInfo):
     directly in attributes
     """
 
+    __slots__ = ('_fullname', '_name', '_status', '_cputime', '_walltime',
+                 '_memusage', '_classification', '_property', '_exitcode',
+                 '_returnvalue', '_prefix')
+
     def __init__(self, nm):
         self._fullname = nm
         self._name = basename(nm)
@@ -158,3 +169,120 @@ class DirectRunInfo(RunInfo):
     def property(self):
         return self._property
 
+
+
+# stands for None in the integer columns of RunInfoBlock
+_NO_INT = -2**63
+
+class RunInfoBlock(object):
+    """
+    Storage of many runs by columns. The strings (status, classification,
+    property and prefix) are stored only once for the whole block
+    and the runs refer to them by their codes, the numbers are stored
+    in arrays. File names are mostly unique, so they are kept in a list.
+    The runs are accessed through BlockRunInfo objects that have
+    the usual RunInfo interface.
+    """
+
+    def __init__(self):
+        # code -> string, the code 0 is for None
+        self._strings = [None]
+        self._codes = {None : 0}
+
+        self._status = array('I')
+        self._classification = array('I')
+        self._property = array('I')
+        self._file = []
+        self._prefix = array('I')
+        # NaN is None here
+        self._cputime = array('d')
+        self._walltime = array('d')
+        # _NO_INT is None here
+        self._memusage = array('q')
+        self._exitcode = array('q')
+
+    def _code(self, s):
+        code = self._codes.get(s)
+        if code is None:
+            code = len(self._strings)
+            self._codes[s] = code
+            self._strings.append(s)
+        return code
+
+    def append(self, res):
+        """
+        Store a run given as a tuple indexed the same way as the query
+        result in DBRunInfo and return the BlockRunInfo for it
+        """
+        assert res[7] != ''
+
+        self._status.append(self._code(res[0]))
+        self._cputime.append(float('nan') if res[1] is None else res[1])
+        self._walltime.append(float('nan') if res[2] is None else res[2])
+        self._memusage.append(_NO_INT if res[3] is None else res[3])
+        self._classification.append(self._code(res[4]))
+        self._exitcode.append(_NO_INT if res[5] is None else res[5])
+        self._property.append(self._code(res[6]))
+        self._file.append(res[7])
+        self._prefix.append(self._code(res[8]))
+
+        return BlockRunInfo(self, len(self._file) - 1)
+
+    def __len__(self):
+        return len(self._file)
+
+    def __getitem__(self, idx):
+        if idx < 0 or idx >= len(self._file):
+            raise IndexError(idx)
+        return BlockRunInfo(self, idx)
+
+    def _string(self, column, idx):
+        return self._strings[column[idx]]
+
+    def _float(self, column, idx):
+        val = column[idx]
+        return None if isnan(val) else val
+
+    def _int(self, column, idx):
+        val = column[idx]
+        return None if val == _NO_INT else val
+
+class BlockRunInfo(RunInfo):
+    """
+    This class represents one instance of a run
+    of a tool on a given benchmark. The information is stored
+    in a RunInfoBlock, this is just a reference into the block.
+    """
+
+    __slots__ = ('_block', '_idx')
+
+    def __init__(self, block, idx):
+        self._block = block
+        self._idx = idx
+
+    def status(self):
+        return self._block._string(self._block._status, self._idx)
+
+    def cputime(self):
+        return self._block._float(self._block._cputime, self._idx)
+
+    def walltime(self):
+        return self._block._float(self._block._walltime, self._idx)
+
+    def memusage(self):
+        return self._block._int(self._block._memusage, self._idx)
+
+    def classification(self):
+        return self._block._string(self._block._classification, self._idx)
+
+    def exitcode(self):
+        return self._block._int(self._block._exitcode, self._idx)
+
+    def property(self):
+        return self._block._string(self._block._property, self._idx)
+
+    def fullname(self):
+        return self._block._file[self._idx]
+
+    def prefix(self):
+        return self._block._string(self._block._prefix, self._idx)
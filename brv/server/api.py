@@ -0,0 +1,110 @@
+import json
+
+from . util import Pager
+from . showfiles import getFilesRows
+
+# The JSON versions of the pages for scripts. They take the same
+# arguments as the pages and use the same queries, but skip the templates.
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def _error(wfile, msg):
+    wfile.write(_dumps({'error' : msg}))
+
+def _getRunIDs(opts):
+    try:
+        return sorted(map(int, opts.get('run', [])))
+    except ValueError:
+        return None
+
+def _toolRun(datamanager, run):
+    return {
+        'id' : run.getID(),
+        'tool' : run.tool(),
+        'version' : run.tool_version(),
+        'date' : str(run.date()),
+        'options' : run.options(),
+        'timelimit' : run.timelimit(),
+        'memlimit' : run.memlimit(),
+        'description' : run.run_description(),
+        'tags' : [t.getName() for t in datamanager.getToolRunTags(run)],
+        'outputs' : run.outputs(),
+    }
+
+def apiToolRuns(wfile, datamanager, opts):
+    """
+    All the tool runs (the list on the main page)
+    """
+    wfile.write(b'[')
+    for (n, run) in enumerate(datamanager.getToolRuns()):
+        if n > 0:
+            wfile.write(b',')
+        wfile.write(_dumps(_toolRun(datamanager, run)))
+    wfile.write(b']')
+
+def apiStats(wfile, datamanager, opts):
+    """
+    The numbers of results of the tool runs by benchmarks sets,
+    statuses and classifications (the data of the results page)
+    """
+    run_ids = _getRunIDs(opts)
+    if not run_ids:
+        _error(wfile, 'No runs of tools given')
+        return
+
+    wfile.write(b'[')
+    for (n, run_id) in enumerate(run_ids):
+        stats = datamanager.getToolInfoStats(run_id)
+        bsets = []
+        for bset_stats in stats.getAllStats().values():
+            results = [[status, classif, cnt, cputime] for ((status, classif), (cnt, cputime))
+                       in bset_stats.getStats().items()]
+            bsets.append({'id' : bset_stats.getBenchmarksID(),
+                          'name' : bset_stats.getBenchmarksName(),
+                          'results' : results})
+        if n > 0:
+            wfile.write(b',')
+        wfile.write(_dumps({'run' : run_id,
+                            'columns' : ['status', 'classification', 'count', 'cputime'],
+                            'benchmarks_sets' : bsets}))
+    wfile.write(b']')
+
+def _runInfo(r):
+    if r is None:
+        return None
+    return [r.status(), r.classification(), r.cputime(), r.walltime(),
+            r.memusage(), r.exitcode()]
+
+def apiFiles(wfile, datamanager, opts):
+    """
+    The comparison of the tool runs on a benchmarks set (the files page),
+    the paging, sorting and filters are given like for the page.
+    The response is written row by row.
+    """
+    run_ids = _getRunIDs(opts)
+    if not run_ids:
+        _error(wfile, 'No runs of tools given')
+        return
+
+    try:
+        bset_id = int(opts['benchmarks'][0])
+    except (ValueError, KeyError):
+        _error(wfile, 'Invalid benchmarks')
+        return
+
+    pager = Pager('api/files', opts, run_ids)
+    rows = getFilesRows(datamanager, opts, run_ids, bset_id, pager)
+
+    wfile.write(_dumps({'runs' : run_ids, 'benchmarks' : bset_id,
+                        'page' : pager.page, 'page_size' : pager.page_size,
+                        'columns' : ['status', 'classification', 'cputime',
+                                     'walltime', 'memusage', 'exitcode']})[:-1])
+    wfile.write(b',"rows":[')
+    for (n, (name, infos)) in enumerate(rows):
+        if n > 0:
+            wfile.write(b',')
+        wfile.write(_dumps([name, [_runInfo(r) for r in infos]]))
+    wfile.write(b'],"has_next":')
+    wfile.write(_dumps(pager.has_next))
+    wfile.write(b'}')
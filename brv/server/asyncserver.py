@@ -0,0 +1,127 @@
+import asyncio
+
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+from .. utils import dbg
+from . handler import Handler
+
+# seconds that an idle connection is kept open
+KEEP_ALIVE_TIMEOUT = 60
+# the maximal size of the request line and headers
+MAX_HEAD_SIZE = 64 * 1024
+
+class _AsyncWriter(object):
+    """
+    File-like object for the worker threads that writes the data
+    to the connection in the event loop. write() returns after the data
+    were passed to the socket, so a slow client slows down the handler
+    instead of the data piling up in memory.
+    """
+
+    def __init__(self, loop, writer):
+        self._loop = loop
+        self._writer = writer
+
+    async def _write(self, data):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    def write(self, data):
+        asyncio.run_coroutine_threadsafe(self._write(bytes(data)), self._loop).result()
+
+    def sendfile(self, f):
+        coro = self._loop.sendfile(self._writer.transport, f)
+        asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def flush(self):
+        pass
+
+class AsyncHandler(Handler):
+    """
+    Handler that processes one request whose head was already read
+    by the event loop. It runs in a worker thread and writes
+    the response using _AsyncWriter.
+    """
+
+    keep_alive = True
+
+    def __init__(self, head, wfile, client_address):
+        # do not call the constructor of the parent, it would
+        # read the request from the socket right away
+        self.rfile = BytesIO(head)
+        self.wfile = wfile
+        self.client_address = client_address
+        self.close_connection = True
+
+    def _sendfile(self, f):
+        self.wfile.sendfile(f)
+
+    def handle(self):
+        self.handle_one_request()
+
+        # we do not read bodies of requests, so we do not know
+        # where the next request starts
+        headers = getattr(self, 'headers', None)
+        if headers and ('Content-Length' in headers or 'Transfer-Encoding' in headers):
+            self.close_connection = True
+
+class AsyncBRVServer(object):
+    """
+    Server that waits for the requests in an event loop and handles
+    them in a pool of worker threads. The connections are kept alive
+    between requests, an idle connection does not occupy a worker.
+    """
+
+    def __init__(self, nm = "", port = 3000, workers = 1):
+        self._address = (nm, port)
+        self._pool = ThreadPoolExecutor(max_workers = workers,
+                                        thread_name_prefix = 'brv-worker')
+
+    async def _serveConnection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        wfile = _AsyncWriter(loop, writer)
+        client_address = writer.get_extra_info('peername')
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                                  KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                handler = AsyncHandler(head, wfile, client_address)
+                await loop.run_in_executor(self._pool, handler.handle)
+                if handler.close_connection:
+                    break
+        except ConnectionError:
+            # the client went away in the middle of the response
+            pass
+        except (Exception, SystemExit) as e:
+            # SystemExit (from err()) would stop the event loop
+            # and the whole server, close only this connection
+            print('Error while handling a request from {0}: {1!r}'.format(client_address, e))
+        finally:
+            writer.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(self._serveConnection,
+                                            self._address[0] or None, self._address[1],
+                                            limit = MAX_HEAD_SIZE)
+        async with server:
+            await server.serve_forever()
+
+    def server_close(self):
+        self._pool.shutdown(wait = True)
+
+    @classmethod
+    def establish(cls, nm = "", port = 3000, workers = 1):
+        httpd = cls(nm, port, workers)
+        dbg("Serving at port {0} asynchronously ({1} worker(s))".format(port, workers))
+
+        try:
+            asyncio.run(httpd.serve())
+        except KeyboardInterrupt:
+            httpd.server_close()
+            print("Stopping...")
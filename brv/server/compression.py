@@ -0,0 +1,114 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    # only gzip is offered
+    brotli = None
+
+# the levels used for the pages that are compressed while they are
+# produced; the static files are compressed once with the best level
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _accepted(header):
+    """
+    Parse the Accept-Encoding header, return the mapping
+    encoding -> q-value
+    """
+    ret = {}
+    for item in header.split(','):
+        parts = item.split(';')
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for p in parts[1:]:
+            key, _, value = p.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ret[name] = q
+    return ret
+
+def choose_encoding(header):
+    """
+    Return the encoding ('br' or 'gzip') that should be used
+    for the response given the Accept-Encoding header,
+    or None if the response should not be compressed
+    """
+    if not header:
+        return None
+
+    accepted = _accepted(header)
+    best, best_q = None, 0.0
+    # brotli is preferred if the client does not say otherwise
+    for enc in ('br', 'gzip'):
+        if enc == 'br' and brotli is None:
+            continue
+        q = accepted.get(enc, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+def compress(data, encoding, best = False):
+    """
+    Compress the whole 'data' at once
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality = 11 if best else BROTLI_QUALITY)
+    assert encoding == 'gzip'
+    c = zlib.compressobj(9 if best else GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return c.compress(data) + c.flush()
+
+class Compressor(object):
+    """
+    File-like object that compresses the written data and writes them
+    to 'wfile'. flush() passes all the data written so far to 'wfile'
+    (so that the client can show a part of the page), close() finishes
+    the compressed stream ('wfile' is left open). The handlers write
+    many small pieces, so they are compressed in blocks of 'bufsize' bytes.
+    """
+
+    def __init__(self, wfile, encoding, bufsize = 64 * 1024):
+        self._wfile = wfile
+        self._bufsize = bufsize
+        self._buf = bytearray()
+        if encoding == 'br':
+            c = brotli.Compressor(quality = BROTLI_QUALITY)
+            self._compress = c.process
+            self._flush = c.flush
+            self._finish = c.finish
+        else:
+            assert encoding == 'gzip'
+            c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = c.compress
+            self._flush = lambda: c.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = c.flush
+
+    def _compressBuffer(self):
+        data = self._compress(bytes(self._buf))
+        self._buf = bytearray()
+        if data:
+            self._wfile.write(data)
+
+    def write(self, data):
+        self._buf += data
+        if len(self._buf) >= self._bufsize:
+            self._compressBuffer()
+
+    def flush(self):
+        self._compressBuffer()
+        data = self._flush()
+        if data:
+            self._wfile.write(data)
+        self._wfile.flush()
+
+    def close(self):
+        self._compressBuffer()
+        data = self._finish()
+        if data:
+            self._wfile.write(data)
+        self._wfile.flush()
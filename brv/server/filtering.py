@@ -0,0 +1,53 @@
+from re import compile
+
+# The comparison filters (different results, incorrect results, ...)
+# are evaluated by the database (see COMPARISON_FILTERS
+# in brv.database.comparison). Only the filters that the database cannot
+# evaluate are left here: regular expressions on statuses and buckets.
+
+def compileStatusFilters(patterns):
+    filters = []
+    for f in patterns:
+        try:
+            filters.append(compile(f))
+        except Exception as e:
+            print('ERROR: Invalid regular expression given in filter: ' + str(e))
+            continue
+        print('Applying {0}'.format(f))
+
+    return filters
+
+def matchStatusFilters(filters, infos):
+    """
+    Return True if for each of the compiled status filters
+    there is a result in 'infos' with the status matching the filter
+    """
+    for rf in filters:
+        if not any(r is not None and rf.search(r.status()) for r in infos):
+            return False
+    return True
+
+def matchBuckets(allowed, infos):
+    """
+    Return True if the result of every tool run is in the set
+    of pairs (status, classification) given for it in 'allowed'
+    """
+    for (r, pairs) in zip(infos, allowed):
+        if r is None or (r.status(), r.classification()) not in pairs:
+            return False
+    return True
+
+def filterRows(rows, status_filters = [], buckets = None):
+    """
+    Return the rows (tuples whose last item is the list of runinfos)
+    that have a status matching each of the compiled 'status_filters'
+    and, if 'buckets' are given, have the results of the tool runs
+    in the buckets (one set of pairs (status, classification)
+    for each tool run).
+    """
+    if not status_filters and buckets is None:
+        return rows
+
+    return [r for r in rows
+            if matchStatusFilters(status_filters, r[-1]) and
+               (buckets is None or matchBuckets(buckets, r[-1]))]
@@ -1,4 +1,4 @@
-from os.path import join, isfile
+from email.utils import formatdate
 
 from http.server import SimpleHTTPRequestHandler
 from urllib.parse import unquote
@@ -13,6 +13,12 @@ from . showoutput import showOutput
 from . showdiagram import showDiagram
 from . showoverall import showOverall
 from . manage import manageTools, performDelete, setToolRunAttr, adjustEnviron
+from . showstats import showStats
+from . api import apiToolRuns, apiStats, apiFiles
+from . streaming import ResponseWriter
+from . pagecache import get_page_cache
+from . compression import Compressor, choose_encoding
+from . static import get_static_assets
 
 # the tools manager object -- it must be globals,
 # since handler is created for each request and we do
@@ -32,11 +38,6 @@ def _parse_args(args):
 
     return opts
 
-def sendFile(wfile, path):
-    f = open(path, 'rb')
-    wfile.write(f.read())
-    f.close()
-
 handlers = {
     'root'              : showTools,
     'results'           : showResults,
@@ -49,10 +50,65 @@ handlers = {
     'output'            : showOutput,
     'set'               : setToolRunAttr,
     'env'               : adjustEnviron,
+    'stats'             : showStats,
+    'api/toolruns'      : apiToolRuns,
+    'api/stats'         : apiStats,
+    'api/files'         : apiFiles,
+}
+
+# handlers that do not produce html
+mimetypes = {
+    'stats'             : 'application/json',
+    'api/toolruns'      : 'application/json',
+    'api/stats'         : 'application/json',
+    'api/files'         : 'application/json',
 }
 
+# handlers whose output depends only on the arguments and the data
+# (see DataManager.getDataGeneration), the browser may reuse them
+cacheable = set([
+    'root', 'results', 'diagram', 'overall', 'files', 'filter',
+    'api/toolruns', 'api/stats', 'api/files',
+])
+
+# send ETags and answer conditional requests
+http_caching = True
+
+# how long the browsers may keep the static files (one week),
+# the URLs with the hash of the content never change (one year)
+STATIC_MAX_AGE = 7 * 24 * 3600
+FINGERPRINTED_MAX_AGE = 365 * 24 * 3600
+
+def set_http_caching(enabled):
+    """
+    Turn on/off the ETags (e.g., when the templates change while
+    the server runs)
+    """
+    global http_caching
+    http_caching = enabled
+
+def _etag_matches(header, etag):
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+    # the ETags may be weak ('W/"..."') and there may be several of them
+    tags = [t.strip() for t in header.split(',')]
+    return any(t == etag or t == 'W/' + etag for t in tags)
+
 # see http://www.acmesystems.it/python_httpd
 class Handler(SimpleHTTPRequestHandler):
+    # needed for the chunked transfer encoding
+    protocol_version = 'HTTP/1.1'
+    # one request per connection (also for the static files, they
+    # are cached by the browser instead), so that idle connections
+    # do not occupy the workers (the async server keeps them alive)
+    keep_alive = False
+
+    def send_response(self, code, message = None):
+        self._response_started = True
+        SimpleHTTPRequestHandler.send_response(self, code, message)
+
     def _parsePath(self):
         args = []
 
@@ -74,35 +130,117 @@ class Handler(SimpleHTTPRequestHandler):
 
         return (path, args)
 
-    def _send_headers(self, mimetype = 'text/html'):
+    def _supports_chunked(self):
+        return self.request_version not in ('HTTP/0.9', 'HTTP/1.0')
+
+    def _send_headers(self, mimetype = 'text/html', length = None, chunked = False,
+                      headers = ()):
         self.send_response(200)
         self.send_header('Content-type', mimetype)
+        for (name, value) in headers:
+            self.send_header(name, value)
+        if length is not None:
+            self.send_header('Content-Length', str(length))
+        elif chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        # without the length the end of the response is the end of the connection
+        if not self.keep_alive or (length is None and not chunked):
+            self.send_header('Connection', 'close')
+        self.end_headers()
+
+    def _encoding(self):
+        return choose_encoding(self.headers.get('Accept-Encoding'))
+
+    def _encoding_headers(self, encoding):
+        # the response depends on Accept-Encoding, caches must know that
+        headers = [('Vary', 'Accept-Encoding')]
+        if encoding is not None:
+            headers.append(('Content-Encoding', encoding))
+        return headers
+
+    def _sendfile(self, f):
+        # the headers are already sent, the socket is not buffered
+        self.connection.sendfile(f)
+
+    def _send_asset(self, asset, fingerprinted):
+        if fingerprinted:
+            cache_control = 'public, max-age={0}, immutable'.format(FINGERPRINTED_MAX_AGE)
+        else:
+            cache_control = 'public, max-age={0}'.format(STATIC_MAX_AGE)
+
+        encoding = self._encoding() if asset.data is not None else None
+        data, encoding = asset.get(encoding)
+        etag = asset.digest if encoding is None else '{0}-{1}'.format(asset.digest, encoding)
+        headers = [('ETag', '"{0}"'.format(etag)), ('Cache-Control', cache_control)]
+        if _etag_matches(self.headers.get('If-None-Match'), headers[0][1]):
+            self._send_not_modified(headers + self._encoding_headers(None))
+            return
+
+        headers += self._encoding_headers(encoding)
+        if data is None:
+            # too large to be kept in memory
+            with open(asset.path, 'rb') as f:
+                self._send_headers(asset.mimetype, length = asset.size, headers = headers)
+                self._sendfile(f)
+            return
+
+        self._send_headers(asset.mimetype, length = len(data), headers = headers)
+        self.wfile.write(data)
+
+    def _send_not_modified(self, headers):
+        self.send_response(304)
+        for (name, value) in headers:
+            self.send_header(name, value)
+        if not self.keep_alive:
+            self.send_header('Connection', 'close')
         self.end_headers()
 
+    def _cache_headers(self, generation, modified, encoding):
+        """
+        Return the headers for caching the response of the handler
+        """
+        if not http_caching or generation is None:
+            return []
+
+        # the compressed and uncompressed responses are different
+        etag = generation if encoding is None else '{0}-{1}'.format(generation, encoding)
+        return [('ETag', '"{0}"'.format(etag)),
+                ('Last-Modified', formatdate(modified, usegmt = True)),
+                # the browser must ask whether the page changed
+                ('Cache-Control', 'no-cache')]
+
     def _get_handler(self, path):
         global handlers
         return handlers.get(path)
 
     def _handle_files(self, path):
-        if path == 'style.css':
-            self._send_headers('text/css')
-            sendFile(self.wfile, 'html/style.css')
-            return True
-        elif path == 'js/brv.js':
-            self._send_headers('text/javascript')
-            sendFile(self.wfile, 'html/js/brv.js')
-            return True
-        elif path.endswith('.gif'):
-            epath = join('html/', path)
-            if isfile(epath):
-                self._send_headers('image/gif')
-                sendFile(self.wfile, epath)
-                return True
+        if path is None:
             return False
 
-        return False
+        asset, fingerprinted = get_static_assets().get(path)
+        if asset is None:
+            return False
+
+        self._send_asset(asset, fingerprinted)
+        return True
 
     def do_GET(self):
+        self._response_started = False
+        try:
+            self._handle_get()
+        except ConnectionError:
+            # the client went away, there is nobody to answer
+            raise
+        except (Exception, SystemExit) as e:
+            # err() exits on a failed query, but only this request
+            # has failed, not the whole server
+            print('Error while handling {0}: {1!r}'.format(self.path, e))
+            datamanager.rollback()
+            self.close_connection = True
+            if not self._response_started:
+                self.send_error(500, 'Internal error')
+
+    def _handle_get(self):
         act, args = self._parsePath()
         handler = self._get_handler(act)
 
@@ -111,12 +249,56 @@ class Handler(SimpleHTTPRequestHandler):
                 # it was a file, we're fine
                 return
 
-            self._send_headers()
             self.send_error(404, 'Unhandled request')
             print(self.path)
             return
 
-        self._send_headers()
+        page_cache = get_page_cache()
+        generation, modified = None, None
+        if act in cacheable and (http_caching or page_cache.enabled()):
+            generation, modified = datamanager.getDataGeneration()
+
+        # the data did not change since the browser got the page,
+        # so the page is the same
+        encoding = self._encoding()
+        cache_headers = self._cache_headers(generation, modified, encoding)
+        if cache_headers and _etag_matches(self.headers.get('If-None-Match'),
+                                           cache_headers[0][1]):
+            self._send_not_modified(cache_headers + self._encoding_headers(None))
+            return
+
+        mimetype = mimetypes.get(act, 'text/html')
+        headers = cache_headers + self._encoding_headers(encoding)
         opts = _parse_args(args)
-        handler(self.wfile, datamanager, opts)
+        key = None
+        if generation is not None and page_cache.enabled():
+            # the pages are cached already compressed
+            key = page_cache.key(act, opts, encoding)
+            page = page_cache.get(key, generation)
+            if page is not None:
+                self._send_headers(mimetype, length = len(page), headers = headers)
+                self.wfile.write(page)
+                return
+
+        # the handlers write the page while they are computing it,
+        # so we send it in chunks as it is produced
+        # (and compress it on the way if the client accepts that)
+        chunked = self._supports_chunked()
+        self._send_headers(mimetype, chunked = chunked, headers = headers)
+        wfile = ResponseWriter(self.wfile, chunked)
+        out = wfile
+        recorder = None
+        if key is not None:
+            out = recorder = page_cache.recorder(out)
+        if encoding is not None:
+            out = Compressor(out, encoding)
+
+        handler(out, datamanager, opts)
+        if encoding is not None:
+            out.close()
+        if recorder is not None:
+            page = recorder.getData()
+            if page is not None:
+                page_cache.put(key, generation, page)
+        wfile.close()
 
@@ -20,7 +20,7 @@ def manageTools(wfile, datamanager, args):
 
     tags_config_file = open('brv/tags.conf')
     tags_config = filter(lambda x: x, map(lambda x: x.strip(), tags_config_file.readlines()))
-    tags = list(datamanager.tagsmanager.getTags())
+    tags = datamanager.getTags()
 
     render_template(wfile, 'manage.html',
                      {'tools' : tools_final,
@@ -45,7 +45,7 @@ def setToolRunAttr(wfile, datamanager, opts):
        tags_config = open('brv/tags.conf', 'w')
        tags_config.write(opts['tags_config'][0])
        tags_config.close()
-       datamanager.tagsmanager.reloadTags()
+       datamanager.reloadTags()
 
        return
 
@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from threading import Lock
+
+# the default size of the cache (in bytes)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+class _Recorder(object):
+    """
+    Passes the written data to 'wfile' and keeps a copy of them,
+    unless there are more than 'limit' bytes
+    """
+
+    def __init__(self, wfile, limit):
+        self._wfile = wfile
+        self._limit = limit
+        self._data = bytearray()
+
+    def write(self, data):
+        self._wfile.write(data)
+        if self._data is not None:
+            self._data += data
+            if len(self._data) > self._limit:
+                self._data = None
+
+    def flush(self):
+        self._wfile.flush()
+
+    def getData(self):
+        return None if self._data is None else bytes(self._data)
+
+class PageCache(object):
+    """
+    LRU cache of rendered pages. The pages are valid for one generation
+    of the data (see DataManager.getDataGeneration), the whole cache
+    is dropped when the generation changes. The size of the stored pages
+    is at most 'max_bytes' bytes, the least recently used pages
+    are evicted to make space for new pages.
+    """
+
+    def __init__(self, max_bytes = DEFAULT_MAX_BYTES):
+        self._max_bytes = max_bytes
+        # one page may take at most a quarter of the cache
+        self._max_page = max_bytes // 4
+        self._lock = Lock()
+        self._pages = OrderedDict()
+        self._bytes = 0
+        self._generation = None
+
+        # counters for monitoring
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def enabled(self):
+        return self._max_bytes > 0
+
+    @staticmethod
+    def key(action, opts, encoding = None):
+        """
+        Return the key of the page computed by the handler 'action'
+        with arguments 'opts' (as returned by _parse_args)
+        and compressed by 'encoding' (None if not compressed)
+        """
+        return (action, tuple(sorted((k, tuple(v)) for (k, v) in opts.items())), encoding)
+
+    def _setGeneration(self, generation):
+        if generation != self._generation:
+            if self._pages:
+                self._invalidations += 1
+            self._pages.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def get(self, key, generation):
+        """
+        Return the page or None if it is not in the cache
+        """
+        with self._lock:
+            self._setGeneration(generation)
+            page = self._pages.get(key)
+            if page is None:
+                self._misses += 1
+                return None
+
+            self._pages.move_to_end(key)
+            self._hits += 1
+            return page
+
+    def put(self, key, generation, page):
+        with self._lock:
+            self._setGeneration(generation)
+            if len(page) > self._max_page or key in self._pages:
+                return
+
+            self._pages[key] = page
+            self._bytes += len(page)
+            while self._bytes > self._max_bytes:
+                _, evicted = self._pages.popitem(last = False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def recorder(self, wfile):
+        """
+        Return a file-like object that writes to 'wfile' and records
+        the page, so that it can be stored using put()
+        """
+        return _Recorder(wfile, self._max_page)
+
+    def getStats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'max_bytes' : self._max_bytes,
+                'bytes' : self._bytes,
+                'pages' : len(self._pages),
+                'hits' : self._hits,
+                'misses' : self._misses,
+                'hit_ratio' : self._hits / lookups if lookups else 0.0,
+                'evictions' : self._evictions,
+                'invalidations' : self._invalidations,
+            }
+
+_cache = PageCache()
+
+def set_page_cache(max_bytes):
+    """
+    Replace the cache of pages by an empty cache of the given size
+    (0 turns caching off)
+    """
+    global _cache
+    _cache = PageCache(max_bytes)
+
+def get_page_cache():
+    return _cache
@@ -1,3 +1,4 @@
+
 import sys
 
 try:
@@ -7,9 +8,76 @@ except ImportError:
     print('Run "pip install quik" or check "http://quik.readthedocs.io/en/latest/"')
     sys.exit(1)
 
+from . static import get_static_assets
+
+TEMPLATES_DIR = 'html/templates/'
+
+class FrozenFileLoader(FileLoader):
+    """
+    FileLoader that reads and compiles every template (and included file)
+    only once and never looks at the files again
+    """
+
+    def __init__(self, basedir):
+        FileLoader.__init__(self, basedir)
+        self._texts = {}
+
+    def load_text(self, name):
+        text = self._texts.get(name)
+        if text is None:
+            text = FileLoader.load_text(self, name)
+            self._texts[name] = text
+        return text
+
+    def load_template(self, name):
+        known = self.known_templates.get(name)
+        if known:
+            return known[0]
+        return FileLoader.load_template(self, name)
+
+# 'frozen' - templates are compiled once (production)
+# 'mtime'  - templates are recompiled when the file changes (development)
+# 'off'    - templates are read and compiled on every request
+CACHE_MODES = ('frozen', 'mtime', 'off')
+
+_loader = FrozenFileLoader(TEMPLATES_DIR)
+
+def set_template_cache(mode):
+    """
+    Set how the compiled templates are cached, see CACHE_MODES
+    """
+    global _loader
+
+    assert mode in CACHE_MODES
+    if mode == 'frozen':
+        _loader = FrozenFileLoader(TEMPLATES_DIR)
+    elif mode == 'mtime':
+        # FileLoader checks the modification time of the file
+        # whenever the template is loaded
+        _loader = FileLoader(TEMPLATES_DIR)
+    else:
+        _loader = None
+
+class _TextWriter(object):
+    """
+    Encode the text written by the template and pass it to 'wfile'
+    """
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+
+    def write(self, text):
+        self._wfile.write(text.encode('utf-8'))
+
 def render_template(wfile, name, variables):
-    loader = FileLoader('html/templates/')
+    """
+    Render the template into 'wfile'. The output is written while
+    the template is evaluated, not after the whole page is rendered.
+    """
+    loader = _loader
+    if loader is None:
+        loader = FileLoader(TEMPLATES_DIR)
     template = loader.load_template(name)
-    wfile.write(template.render(variables,
-                                loader=loader).encode('utf-8'))
-
+    # the URLs of the static files
+    variables = dict(variables, assets = get_static_assets().urls())
+    template.merge_to(variables, _TextWriter(wfile), loader=loader)
@@ -2,10 +2,42 @@ import socketserver
 
 import socket
 
+from concurrent.futures import ThreadPoolExecutor
+
 from .. utils import dbg
 from . handler import Handler
 
-class BRVServer(socketserver.TCPServer):
+class ThreadPoolMixIn(object):
+    """
+    Mix-in class that handles each request in a bounded pool
+    of worker threads. Requests that arrive when all workers are busy
+    wait (already accepted) until some worker is free.
+    """
+
+    def _create_pool(self, workers):
+        self._pool = ThreadPoolExecutor(max_workers = workers,
+                                        thread_name_prefix = 'brv-worker')
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait = True)
+
+class BRVServer(ThreadPoolMixIn, socketserver.TCPServer):
+    def __init__(self, server_address, handler, workers = 1):
+        socketserver.TCPServer.__init__(self, server_address, handler)
+        self._create_pool(workers)
+
     # redefine server_bind so that we do not have TIME_WAIT issue
     # after closing the connection
     # https://stackoverflow.com/questions/6380057/python-binding-socket-address-already-in-use
@@ -14,13 +46,13 @@ class BRVServer(socketserver.TCPServer):
         self.socket.bind(self.server_address)
 
     @classmethod
-    def get(cls, nm = "", port = 3000):
-        return cls((nm, port), Handler)
+    def get(cls, nm = "", port = 3000, workers = 1):
+        return cls((nm, port), Handler, workers)
 
     @classmethod
-    def establish(cls, nm = "", port = 3000):
-        httpd = cls.get(nm, port)
-        dbg("Serving at port {0}".format(port))
+    def establish(cls, nm = "", port = 3000, workers = 1):
+        httpd = cls.get(nm, port, workers)
+        dbg("Serving at port {0} ({1} worker(s))".format(port, workers))
 
         try:
             httpd.serve_forever()
@@ -74,9 +74,9 @@ class RunsData:
 class FilesData:
     def __init__(self, datamanager, run_ids, runs, cats, buckets):
         tables = []
-#retrieve tables for all categories
-        for cat in cats:
-            tables += list(datamanager.getRunInfos(cat.id, run_ids).getRows().items())
+#retrieve tables for all categories (by one query)
+        for (bset_id, table) in datamanager.getRunInfosBySets([cat.id for cat in cats], run_ids):
+            tables += list(table.getRows().items())
         self.tables = tables
         self.buckets = buckets
         self.runs = runs
@@ -1,12 +1,35 @@
 from . rendering import render_template
-from . util import get_elem, getDescriptionOrVersion, getBenchmarkURL, getShortName
-from os.path import basename
-from re import compile
-import sys
+from . util import get_elem, getDescriptionOrVersion, getBenchmarkURL, getShortName, LazySequence, Pager
+from . util import getComparisonFilters
+from . filtering import filterRows, compileStatusFilters
 
 def None2Empty(s):
     return s if s else ''
 
+def getFilesRows(datamanager, opts, run_ids, bset_id, pager):
+    """
+    Return the rows (benchmark name, list of runinfos) of the comparison
+    of the tool runs on the benchmarks set that are on the current page
+    and pass the filters given in 'opts'. Sets pager.has_next.
+    """
+    # 'different_status' compares also the classification here
+    comparison_filters = getComparisonFilters(opts, classif = True)
+    status_filters = opts.get('filter')
+
+    # the database does the filtering, sorting and paging for us,
+    # only the regular expressions are matched here
+    if not status_filters:
+        rows, pager.has_next\
+            = datamanager.getRunInfosPage([bset_id], run_ids, pager.sort,
+                                          pager.offset(), pager.page_size,
+                                          comparison_filters)
+        return [(name, infos) for (_, name, infos) in rows]
+
+    rows, _ = datamanager.getRunInfosPage([bset_id], run_ids, pager.sort,
+                                          filters = comparison_filters)
+    rows = filterRows(rows, status_filters = compileStatusFilters(status_filters))
+    return pager.take([(name, infos) for (_, name, infos) in rows])
+
 def showFiles(wfile, datamanager, opts):
     if not 'run' in opts:
         wfile.write(b'<h2>No runs of tools given</h2>')
@@ -37,8 +60,7 @@ def showFiles(wfile, datamanager, opts):
     _differentTimes10 = 'time_diff_10' in opts
     _differentTimes50 = 'time_diff_50' in opts
     _filter = opts.setdefault('filter', [])
-
-    results = datamanager.getRunInfos(bset_id, run_ids).getRows().items()
+    pager = Pager('files', opts, run_ids)
 
     bsets = datamanager.getBenchmarksSets()
     bset = None
@@ -47,109 +69,11 @@ def showFiles(wfile, datamanager, opts):
         if bs.id == bset_id:
             bset = bs
 
-    if _showDifferentStatus:
-        def some_different(x):
-            L = x[1]
-            if L[0] is None:
-                status = None
-                classification = None
-            else:
-                status = L[0].status()
-                classification = L[0].classification()
-
-            for r in L:
-                if r is None:
-                    if status is not None:
-                        return True
-                    if classification is not None:
-                        return True
-                elif r.status() != status:
-                    return True
-                elif r.classification() != classification:
-                    return True
-
-            return False
-
-        results = filter(some_different, results)
-
-    if _showDifferentClassif:
-        def some_different(x):
-            L = x[1]
-            if L[0] is None:
-                classif = None
-            else:
-                classif = L[0].classification()
-
-            for r in L:
-                if r is None:
-                    if classif is not None:
-                        return True
-                elif r.classification() != classif:
-                    return True
-
-            return False
-
-        results = filter(some_different, results)
-
-    if _differentTimes10:
-        def time_diff_10(x):
-            L = x[1]
-            min_x = min(L, key=lambda x: sys.float_info.max if x is None else x.cputime())
-            max_x = max(L, key=lambda x: -1 if x is None else x.cputime())
-            if min_x.cputime() > 1 and max_x.cputime() > min_x.cputime() * 1.1:
-                return True
-
-            return False
-
-        results = filter(time_diff_10, results)
-
-    if _differentTimes50:
-        def time_diff_50(x):
-            L = x[1]
-            min_x = min(L, key=lambda x: sys.float_info.max if x is None else x.cputime())
-            max_x = max(L, key=lambda x: -1 if x is None else x.cputime())
-            if min_x.cputime() > 1 and max_x.cputime() > min_x.cputime() * 1.5:
-                return True
-
-            return False
-
-        results = filter(time_diff_50, results)
-
-    if _showIncorrect:
-        def some_incorrect(x):
-            L = x[1]
-            for r in L:
-                if r is not None and r.classification() == 'wrong':
-                    return True
-
-            return False
-
-        results = filter(some_incorrect, results)
-
-    if _filter:
-        filters = []
-        for f in _filter:
-            try:
-                rf = compile(f)
-            except Exception as e:
-                print('ERROR: Invalid regular expression given in filter: ' + str(e))
-                continue
-            filters.append((f, lambda x : rf.search(x)))
-
-        for (pattern, f) in filters:
-            def match(x):
-                L = x[1]
-                for r in L:
-                    if r and f(r.status()):
-                        return True
-                return False
-
-            print('Applying {0}'.format(pattern))
-            results = filter(match, results)
+    # the rows are computed when the template gets to them,
+    # so that the header of the page is sent to the client first
+    def _getResults(bset_id):
+        return getFilesRows(datamanager, opts, run_ids, bset_id, pager)
 
-    results = sorted(list(results), key=lambda x: basename(x[0]))
-    if results:
-        assert len(runs) == len(results[0][1])
     outputs = [None2Empty(r.outputs()) for r in runs]
     render_template(wfile, 'files.html',
                      {'runs' : runs,
@@ -165,5 +89,6 @@ def showFiles(wfile, datamanager, opts):
                       'descr' : getDescriptionOrVersion,
                       'filters' : _filter,
                       'bset': bset,
-                      'results': results})
+                      'pager': pager,
+                      'results': LazySequence(_getResults, [bset_id], wfile)})
 
@@ -1,7 +1,7 @@
 from . rendering import render_template
-from . util import get_elem, getDescriptionOrVersion, getBenchmarkURL, getShortName
-from re import compile
-import sys
+from . util import get_elem, getDescriptionOrVersion, getBenchmarkURL, getShortName, LazySequence
+from . util import getComparisonFilters
+from . filtering import filterRows, compileStatusFilters
 
 def None2Empty(s):
     return s if s else ''
@@ -44,129 +44,44 @@ def showFilter(wfile, datamanager, opts):
     _differentTimes50 = 'time_diff_50' in opts
     _filter = opts.setdefault('filter', [])
 
-    # list of tuples (bset, RunInfosTable)
-    output_tables = []
+    # 'different_status' compares only the status here and we are interested
+    # only in benchmarks that have results of all the tool runs
+    comparison_filters = getComparisonFilters(opts, classif = False)
+    comparison_filters.append('all_present')
+    status_filters = compileStatusFilters(_filter)
+
+    # the results of every tool run must be in the bucket given for it
+    allowed = []
+    for run_id in run_ids:
+        pairs = set()
+        for bucket in buckets:
+            if bucket.getDisplayName() == run_bucket[run_id]:
+                pairs.update(bucket.getClassifications())
+        allowed.append(pairs)
+
     bsets = datamanager.getBenchmarksSets()
-    # the filtering must be done by category
-    for bset in bsets:
-        results = datamanager.getRunInfos(bset.id, run_ids).getRows().items()
-
-        if _showDifferentStatus:
-            def some_different(x):
-                L = x[1]
-                if L[0] is None:
-                    status = None
-                else:
-                    status = L[0].status()
-
-                for r in L:
-                    if r is None:
-                        if status is not None:
-                            return True
-                    elif r.status() != status:
-                        return True
-
-                return False
-
-            results = filter(some_different, results)
-
-        if _showDifferentClassif:
-            def some_different(x):
-                L = x[1]
-                if L[0] is None:
-                    classif = None
-                else:
-                    classif = L[0].classification()
-
-                for r in L:
-                    if r is None:
-                        if classif is not None:
-                            return True
-                    elif r.classification() != classif:
-                        return True
-
-                return False
-
-            results = filter(some_different, results)
-
-
-
-        if _differentTimes10:
-            def time_diff_10(x):
-                L = x[1]
-                min_x = min(L, key=lambda x: sys.float_info.max if x is None else x.cputime())
-                max_x = max(L, key=lambda x: -1 if x is None else x.cputime())
-                if min_x.cputime() > 1 and max_x.cputime() > min_x.cputime() * 1.1:
-                    return True
-
-                return False
-
-            results = filter(time_diff_10, results)
-
-        if _differentTimes50:
-            def time_diff_50(x):
-                L = x[1]
-                min_x = min(L, key=lambda x: sys.float_info.max if x is None else x.cputime())
-                max_x = max(L, key=lambda x: -1 if x is None else x.cputime())
-                if min_x.cputime() > 1 and max_x.cputime() > min_x.cputime() * 1.5:
-                    return True
-
-                return False
-
-            results = filter(time_diff_50, results)
-
-        if _showIncorrect:
-            def some_incorrect(x):
-                L = x[1]
-                for r in L:
-                    if r is not None and r.classification() == 'wrong':
-                        return True
-
-                return False
-
-            results = filter(some_incorrect, results)
-
-        if _filter:
-            filters = []
-            for f in _filter:
-                try:
-                    rf = compile(f)
-                except Exception as e:
-                    print('ERROR: Invalid regular expression given in filter: ' + str(e))
-                    continue
-                filters.append((f, lambda x : rf.search(x)))
-
-            for (pattern, f) in filters:
-                def match(x):
-                    L = x[1]
-                    for r in L:
-                        if r and f(r.status()):
-                            return True
-                    return False
-
-                print('Applying {0}'.format(pattern))
-                results = filter(match, results)
-
-        def correct_buckets(x):
-            L = x[1]
-            stay = True
-            for r, run_id in zip(L, run_ids):
-                if r is None:
-                    return False
-                desired_bucket_name = run_bucket[run_id]
-                sc = (r.status(), r.classification())
-                found = False
-                for bucket in buckets:
-                    if sc in bucket.getClassifications() and bucket.getDisplayName() == desired_bucket_name:
-                        found = True
-                stay = stay and found
-            return stay
-        results = filter(correct_buckets, results)
-        results = list(results)
-        if results:
-            assert len(runs) == len(results[0][1])
-        if len(results) > 0:
-            output_tables.append((bset, results))
+
+    # the tables are computed when the template gets to them,
+    # so that the header of the page is sent to the client first
+    def _getTables(bsets):
+        # the database does the filtering for us (for all the benchmarks
+        # sets in one query), only the regular expressions and buckets
+        # are matched here. The rows are ordered by the benchmarks set.
+        rows, _ = datamanager.getRunInfosPage([bs.id for bs in bsets], run_ids,
+                                              ('name', None, False),
+                                              filters = comparison_filters)
+        rows = filterRows(rows, status_filters = status_filters, buckets = allowed)
+
+        tables = []
+        for (bset_id, name, infos) in rows:
+            assert len(runs) == len(infos)
+            if not tables or tables[-1][0].id != bset_id:
+                bset = next(bs for bs in bsets if bs.id == bset_id)
+                tables.append((bset, []))
+            tables[-1][1].append((name, infos))
+        return tables
+
+    output_tables = LazySequence(_getTables, [bsets], wfile) if bsets else []
 
     outputs = [None2Empty(r.outputs()) for r in runs]
     render_template(wfile, 'filter.html',
@@ -182,5 +97,6 @@ def showFilter(wfile, datamanager, opts):
                       'timeDiff50' : _differentTimes50,
                       'descr' : getDescriptionOrVersion,
                       'filters' : _filter,
+                      'pager' : None,
                       'outputTables': output_tables})
 
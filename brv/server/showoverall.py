@@ -1,7 +1,7 @@
 from . rendering import render_template
-from . util import get_elem, getDescriptionOrVersion, getBenchmarkURL, getShortName
-from re import compile
-import sys
+from . util import get_elem, getDescriptionOrVersion, getBenchmarkURL, getShortName, LazySequence, Pager
+from . util import getComparisonFilters
+from . filtering import filterRows, compileStatusFilters
 
 def None2Empty(s):
     return s if s else ''
@@ -27,114 +27,37 @@ def showOverall(wfile, datamanager, opts):
     _differentTimes10 = 'time_diff_10' in opts
     _differentTimes50 = 'time_diff_50' in opts
     _filter = opts.setdefault('filter', [])
+    pager = Pager('overall', opts, run_ids)
 
-    # list of tuples (bset, RunInfosTable)
-    output_tables = []
-    bsets = datamanager.getBenchmarksSets()
-    # the filtering must be done by category
-    for bset in bsets:
-        results = datamanager.getRunInfos(bset.id, run_ids).getRows().items()
-
-        if _showDifferentStatus:
-            def some_different(x):
-                L = x[1]
-                if L[0] is None:
-                    status = None
-                else:
-                    status = L[0].status()
-
-                for r in L:
-                    if r is None:
-                        if status is not None:
-                            return True
-                    elif r.status() != status:
-                        return True
-
-                return False
-
-            results = filter(some_different, results)
-
-        if _showDifferentClassif:
-            def some_different(x):
-                L = x[1]
-                if L[0] is None:
-                    classif = None
-                else:
-                    classif = L[0].classification()
-
-                for r in L:
-                    if r is None:
-                        if classif is not None:
-                            return True
-                    elif r.classification() != classif:
-                        return True
-
-                return False
-
-            results = filter(some_different, results)
-
-
-        if _differentTimes10:
-            def time_diff_10(x):
-                L = x[1]
-                min_x = min(L, key=lambda x: sys.float_info.max if x is None else x.cputime())
-                max_x = max(L, key=lambda x: -1 if x is None else x.cputime())
-                if min_x.cputime() > 1 and max_x.cputime() > min_x.cputime() * 1.1:
-                    return True
+    # 'different_status' compares only the status here
+    comparison_filters = getComparisonFilters(opts, classif = False)
 
-                return False
-
-            results = filter(time_diff_10, results)
-
-        if _differentTimes50:
-            def time_diff_50(x):
-                L = x[1]
-                min_x = min(L, key=lambda x: sys.float_info.max if x is None else x.cputime())
-                max_x = max(L, key=lambda x: -1 if x is None else x.cputime())
-                if min_x.cputime() > 1 and max_x.cputime() > min_x.cputime() * 1.5:
-                    return True
-
-                return False
-
-            results = filter(time_diff_50, results)
-
-        if _showIncorrect:
-            def some_incorrect(x):
-                L = x[1]
-                for r in L:
-                    if r is not None and r.classification() == 'wrong':
-                        return True
-
-                return False
-
-            results = filter(some_incorrect, results)
-
-        if _filter:
-            filters = []
-            for f in _filter:
-                try:
-                    rf = compile(f)
-                except Exception as e:
-                    print('ERROR: Invalid regular expression given in filter: ' + str(e))
-                    continue
-                filters.append((f, lambda x : rf.search(x)))
-
-            for (pattern, f) in filters:
-                def match(x):
-                    L = x[1]
-                    for r in L:
-                        if r and f(r.status()):
-                            return True
-                    return False
-
-                print('Applying {0}'.format(pattern))
-                results = filter(match, results)
+    bsets = datamanager.getBenchmarksSets()
 
-        results = list(results)
-        if results:
-            assert len(runs) == len(results[0][1])
-        if len(results) > 0:
-            output_tables.append((bset, results))
+    # the page is computed when the template gets to it,
+    # so that the header of the page is sent to the client first
+    def _getPage(bsets):
+        # the database does the filtering, sorting and paging for us,
+        # only the regular expressions are matched here
+        if not _filter:
+            rows, pager.has_next\
+                = datamanager.getRunInfosPage([bs.id for bs in bsets], run_ids,
+                                              pager.sort, pager.offset(),
+                                              pager.page_size, comparison_filters)
+        else:
+            rows, _ = datamanager.getRunInfosPage([bs.id for bs in bsets], run_ids,
+                                                  pager.sort, filters = comparison_filters)
+            rows = pager.take(filterRows(rows, status_filters = compileStatusFilters(_filter)))
+
+        tables = []
+        for (bset_id, name, infos) in rows:
+            if not tables or tables[-1][0].id != bset_id:
+                bset = next(bs for bs in bsets if bs.id == bset_id)
+                tables.append((bset, []))
+            tables[-1][1].append((name, infos))
+        return tables
+
+    output_tables = LazySequence(_getPage, [bsets], wfile) if bsets else []
 
     outputs = [None2Empty(r.outputs()) for r in runs]
     render_template(wfile, 'filter.html',
@@ -150,5 +73,6 @@ def showOverall(wfile, datamanager, opts):
                       'timeDiff50' : _differentTimes50,
                       'descr' : getDescriptionOrVersion,
                       'filters' : _filter,
+                      'pager' : pager,
                       'outputTables': output_tables})
 
@@ -0,0 +1,13 @@
+import json
+
+from . pagecache import get_page_cache
+
+def showStats(wfile, datamanager, opts):
+    """
+    Dump counters that are useful for monitoring the server
+    """
+    stats = {
+        'database_pool' : datamanager.getDBStats(),
+        'page_cache' : get_page_cache().getStats(),
+    }
+    wfile.write(json.dumps(stats, indent=2, sort_keys=True).encode('utf-8'))
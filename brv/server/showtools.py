@@ -120,7 +120,7 @@ def showTools(wfile, datamanager, opts):
             return True
     else:
         _runs_filter = None
-    tags = list(datamanager.tagsmanager.getTags())
+    tags = datamanager.getTags()
 
     sort_method = 'version'
     if 'sort' in opts:
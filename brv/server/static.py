@@ -0,0 +1,172 @@
+import os
+import mimetypes
+from hashlib import sha256
+from threading import Lock
+
+from .. utils import hashFile
+from . compression import compress, brotli
+
+STATIC_DIR = 'html/'
+# the files from STATIC_DIR that are served (the rest are templates)
+ASSET_EXTENSIONS = ('.css', '.js', '.gif', '.png', '.jpg', '.svg', '.ico')
+# larger files are not kept in memory, they are sent using sendfile
+PRELOAD_MAX_SIZE = 1024 * 1024
+# smaller files are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+def _fingerprinted(name, digest):
+    """
+    Return the name of the file with the hash of its content,
+    e.g., js/brv.js -> js/brv.0123456789.js
+    """
+    base, ext = os.path.splitext(name)
+    return '{0}.{1}{2}'.format(base, digest, ext)
+
+class Asset(object):
+    """
+    A static file. Small files are held in memory together with
+    their compressed versions, 'data' is None for the large files.
+    """
+
+    def __init__(self, name, path):
+        st = os.stat(path)
+        self.name = name
+        self.path = path
+        self.mtime = st.st_mtime
+        self.size = st.st_size
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        # encoding -> compressed data, only the variants that
+        # are noticeably smaller are kept
+        self.variants = {}
+
+        if self.size > PRELOAD_MAX_SIZE:
+            self.data = None
+            self.digest = hashFile(path)[:10]
+        else:
+            with open(path, 'rb') as f:
+                self.data = f.read()
+            self.size = len(self.data)
+            self.digest = sha256(self.data).hexdigest()[:10]
+            self._compress()
+
+        self.url = _fingerprinted(name, self.digest)
+
+    def _compress(self):
+        if self.size < MIN_COMPRESS_SIZE:
+            return
+        for enc in ('br', 'gzip'):
+            if enc == 'br' and brotli is None:
+                continue
+            comp = compress(self.data, enc, best = True)
+            if len(comp) < 0.9 * self.size:
+                self.variants[enc] = comp
+
+    def get(self, encoding):
+        """
+        Return the pair (data, encoding) with the content compressed
+        by 'encoding', or the pair (data, None) with the uncompressed
+        content if the compressed version is not kept
+        """
+        data = self.variants.get(encoding)
+        if data is None:
+            return self.data, None
+        return data, encoding
+
+class StaticAssets(object):
+    """
+    The static files from the directory, all of them are read when
+    the object is created. They are available under their names
+    (e.g., 'js/brv.js') and under the names with the hash of the content
+    (see Asset.url), which the browser may cache forever.
+    If 'check_mtime' is True, a file is read again when it changes.
+    """
+
+    def __init__(self, directory, check_mtime = False):
+        self._check_mtime = check_mtime
+        self._lock = Lock()
+        # name or fingerprinted name -> Asset
+        self._assets = {}
+        self._urls = None
+
+        for (root, dirs, files) in os.walk(directory):
+            dirs[:] = [d for d in dirs if d != 'templates']
+            for f in files:
+                if f.endswith(ASSET_EXTENSIONS):
+                    path = os.path.join(root, f)
+                    self._add(Asset(os.path.relpath(path, directory), path))
+
+    def _add(self, asset):
+        self._assets[asset.name] = asset
+        self._assets[asset.url] = asset
+        self._urls = None
+
+    def _reload(self, asset):
+        try:
+            if os.stat(asset.path).st_mtime == asset.mtime:
+                return asset
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            self._assets.pop(asset.url, None)
+            asset = Asset(asset.name, asset.path)
+            self._add(asset)
+        return asset
+
+    def get(self, name):
+        """
+        Return the pair (asset, fingerprinted) for the name from the URL
+        ('fingerprinted' is True if the name contains the hash),
+        or (None, False) if there is no such file
+        """
+        asset = self._assets.get(name)
+        if asset is None:
+            return None, False
+        fingerprinted = name != asset.name
+        if self._check_mtime:
+            asset = self._reload(asset)
+            # the file changed, the browser has to ask for the new URL
+            if asset is None or (fingerprinted and name != asset.url):
+                return None, False
+        return asset, fingerprinted
+
+    def urls(self):
+        """
+        Return the mapping for templates from the names of the files with
+        '/' and '.' replaced by '_' (e.g., 'js_brv_js') to the fingerprinted names
+        """
+        if self._check_mtime:
+            with self._lock:
+                assets = list(self._assets.values())
+            for asset in assets:
+                self._reload(asset)
+
+        urls = self._urls
+        if urls is None:
+            with self._lock:
+                urls = {a.name.replace('/', '_').replace('.', '_') : a.url
+                        for a in self._assets.values()}
+            self._urls = urls
+        return urls
+
+_assets = None
+_assets_lock = Lock()
+_check_mtime = False
+
+def set_static_reload(enabled):
+    """
+    Turn on/off reading the static files again when they are modified
+    """
+    global _assets, _check_mtime
+    _check_mtime = enabled
+    _assets = None
+
+def get_static_assets():
+    """
+    Return the static files, they are read on the first call
+    """
+    global _assets
+    with _assets_lock:
+        if _assets is None:
+            _assets = StaticAssets(STATIC_DIR, _check_mtime)
+        return _assets
@@ -0,0 +1,44 @@
+
+class ResponseWriter(object):
+    """
+    File-like object that handlers write the body of the response to.
+    The data are buffered and sent to the client in pieces of 'bufsize'
+    bytes (or when flush() is called), using the chunked transfer encoding
+    if 'chunked' is True. close() must be called at the end
+    of the response.
+    """
+
+    def __init__(self, wfile, chunked = True, bufsize = 32 * 1024):
+        self._wfile = wfile
+        self._chunked = chunked
+        self._bufsize = bufsize
+        self._buf = bytearray()
+        self._closed = False
+
+    def write(self, data):
+        assert not self._closed
+        self._buf += data
+        if len(self._buf) >= self._bufsize:
+            self.flush()
+
+    def flush(self):
+        if not self._buf:
+            return
+
+        if self._chunked:
+            self._wfile.write('{0:x}\r\n'.format(len(self._buf)).encode('ascii'))
+            self._buf += b'\r\n'
+        self._wfile.write(self._buf)
+        self._wfile.flush()
+        self._buf = bytearray()
+
+    def close(self):
+        if self._closed:
+            return
+
+        self.flush()
+        if self._chunked:
+            # the last (empty) chunk
+            self._wfile.write(b'0\r\n\r\n')
+            self._wfile.flush()
+        self._closed = True
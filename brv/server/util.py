@@ -1,4 +1,5 @@
 from os.path import basename
+from urllib.parse import quote
 
 def getDescriptionOrVersion(toolr):
     descr = toolr.run_description()
@@ -22,3 +23,155 @@ def getBenchmarkURL(name):
 
 def getShortName(name):
     return basename(name)
+
+class LazySequence(object):
+    """
+    Sequence for templates whose items are computed only when
+    the template iterates over them. Before computing the items,
+    the part of the page rendered so far is sent to the client.
+
+    The items are the concatenation of the lists returned by
+    'fun' called on the elements of 'args'. The sequence can be
+    iterated over only once and its length is only an estimate.
+    """
+
+    def __init__(self, fun, args, wfile = None):
+        self._fun = fun
+        self._args = args
+        self._wfile = wfile
+
+    def __len__(self):
+        return len(self._args)
+
+    def __getitem__(self, idx):
+        # quik wants sequences to have this method,
+        # but it iterates over them using __iter__
+        raise NotImplementedError
+
+    def __iter__(self):
+        for arg in self._args:
+            if self._wfile:
+                self._wfile.flush()
+            for item in self._fun(arg):
+                yield item
+
+DEFAULT_PAGE_SIZE = 500
+
+def _parse_sort(sort, run_ids):
+    """
+    Parse the 'sort' argument: 'name', 'cputime:RUN_ID' or 'status:RUN_ID',
+    optionally prefixed with '-' for descending order.
+    Return a triple (kind, run_id, descending).
+    """
+    descending = sort.startswith('-')
+    if descending:
+        sort = sort[1:]
+
+    kind, _, run = sort.partition(':')
+    if kind not in ('cputime', 'status') or not run_ids:
+        return ('name', None, descending)
+
+    try:
+        run_id = int(run)
+    except ValueError:
+        run_id = None
+    if run_id not in run_ids:
+        run_id = run_ids[0]
+
+    return (kind, run_id, descending)
+
+def _get_int_arg(opts, name, default):
+    try:
+        return int(opts[name][0])
+    except (KeyError, ValueError):
+        return default
+
+class Pager(object):
+    """
+    Splits a listing of benchmarks into pages. Keeps the position
+    of the current page (given by 'page', 'page_size' and 'sort' arguments)
+    and creates links to other pages that preserve the other arguments.
+    """
+
+    def __init__(self, action, opts, run_ids):
+        self._action = action
+        self._opts = opts
+        self.page = max(1, _get_int_arg(opts, 'page', 1))
+        self.page_size = _get_int_arg(opts, 'page_size', DEFAULT_PAGE_SIZE)
+        if self.page_size < 1:
+            self.page_size = DEFAULT_PAGE_SIZE
+        self.sort = _parse_sort(opts.get('sort', ['name'])[0], run_ids)
+        self._run_ids = run_ids
+
+        # set when we find out that there are more results
+        self.has_next = False
+        # how many rows went through take()
+        self._seen = 0
+
+    def offset(self):
+        return (self.page - 1) * self.page_size
+
+    def take(self, rows):
+        """
+        Return the part of 'rows' that belongs to this page. Can be called
+        repeatedly on consecutive parts of the listing.
+        """
+        start = self._seen
+        self._seen += len(rows)
+        end = self.offset() + self.page_size
+        if self._seen > end:
+            self.has_next = True
+
+        return rows[max(0, self.offset() - start):max(0, end - start)]
+
+    def _url(self, **changes):
+        args = []
+        for (key, vals) in self._opts.items():
+            if key in changes:
+                continue
+            for v in vals:
+                args.append('{0}={1}'.format(key, quote(v)))
+        for (key, val) in changes.items():
+            args.append('{0}={1}'.format(key, quote(str(val))))
+
+        return '{0}?{1}'.format(self._action, '&'.join(args))
+
+    def prevURL(self):
+        if self.page <= 1:
+            return None
+        return self._url(page = self.page - 1)
+
+    def nextURL(self):
+        if not self.has_next:
+            return None
+        return self._url(page = self.page + 1)
+
+    def sortURL(self, kind, run_id = None):
+        """
+        Link to the first page sorted by the given key. If the listing
+        is already sorted by this key, the order is reversed.
+        """
+        sort = kind if run_id is None else '{0}:{1}'.format(kind, run_id)
+        if self.sort == (kind, run_id, False):
+            sort = '-' + sort
+        return self._url(sort = sort, page = 1)
+
+def getComparisonFilters(opts, classif = True):
+    """
+    Return the filters of the comparison (keys of COMPARISON_FILTERS)
+    set in the GET arguments. If 'classif' is True, 'different_status'
+    compares also the classification of the results.
+    """
+    filters = []
+    if 'different_status' in opts:
+        filters.append('different_result' if classif else 'different_status')
+    if 'different_classif' in opts:
+        filters.append('different_classif')
+    if 'time_diff_10' in opts:
+        filters.append('time_diff_10')
+    if 'time_diff_50' in opts:
+        filters.append('time_diff_50')
+    if 'incorrect' in opts:
+        filters.append('incorrect')
+
+    return filters
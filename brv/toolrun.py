@@ -207,6 +207,17 @@ def _comparable_name(name):
 
     return name[start:]
 
+def _tool_run_columns(tool_run_ids):
+    """
+    Return the mapping from the tool run ids to the lists of the columns
+    where their results go (a tool run that is given more times
+    has more columns, the same as when the tool runs are added one by one)
+    """
+    columns = {}
+    for (n, tid) in enumerate(tool_run_ids):
+        columns.setdefault(tid, []).append(n)
+    return columns
+
 class RunInfosTable(object):
     """
     Table of RunInfo objects:
@@ -222,6 +233,32 @@ class RunInfosTable(object):
         self._benchmarks = {}
         self._tools_num = 0
 
+    @classmethod
+    def fromRuns(cls, runs, tool_run_ids):
+        """
+        Create the table of the given tool runs from pairs (tool_run_id,
+        runinfo) of all the tool runs at once. The pairs should be ordered
+        by the benchmark, then the table is built in one pass without
+        looking up the rows of the benchmarks again. A tool run whose id
+        is given more times has a column for each occurrence.
+        """
+        table = cls()
+        table._tools_num = len(tool_run_ids)
+        columns = _tool_run_columns(tool_run_ids)
+
+        last = None
+        infos = None
+        for (tid, info) in runs:
+            name = _comparable_name(info.fullname())
+            assert name
+            if name != last:
+                infos = table._benchmarks.setdefault(name, [None] * table._tools_num)
+                last = name
+            for n in columns[tid]:
+                infos[n] = info
+
+        return table
+
     def add(self, runinfos):
         """ add results from one tool run"""
 
@@ -1,3 +1,5 @@
+from hashlib import sha256
+
 def err(msg):
     import sys
 
@@ -8,3 +10,15 @@ def err(msg):
 
 def dbg(msg):
     print('[BRV-dbg] {0}'.format(msg))
+
+def hashFile(path, opener = None):
+    """
+    Return the SHA-256 (in hex) of the content of the file, it is read
+    in chunks. 'opener' opens the file for reading in binary mode
+    instead of open() (e.g., to decompress it on the fly).
+    """
+    h = sha256()
+    with (opener(path) if opener else open(path, 'rb')) as f:
+        for data in iter(lambda: f.read(1 << 20), b''):
+            h.update(data)
+    return h.hexdigest()
@@ -1,28 +1,34 @@
-from brv.runinfo import DirectRunInfo
+from brv.runinfo import DirectRunInfo, DBRunInfo
 from brv.toolrun import ToolRun
-from brv.utils import err
+from brv.utils import err, hashFile
 
 import sys
+import bz2
+import gzip
+import lzma
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import time
 
 from xml.dom import minidom
+from xml.etree.ElementTree import iterparse
 
-def _parse_run_elem(run):
-    " Parse a <run>...</run> elements from xml"
+def _parse_run(name, properties, columns):
+    """
+    Create a DirectRunInfo object from the attributes of a <run> element.
+    'columns' is an iterable of (title, value) pairs of its <column> elements
+    """
 
-    name = run.getAttribute('name')
     # strip off ../.. if this is the benchmark from sv-comp
     start = name.find("sv-benchmarks")
     if start != -1:
         name = name[start:]
     r = DirectRunInfo(name)
-    r._property = run.getAttribute('properties')
+    r._property = properties
 
     NUMBER_OF_ITEMS = 7
     n = 0
-    for col in run.getElementsByTagName('column'):
-        title = col.getAttribute('title')
-        value = col.getAttribute('value')
-
+    for (title, value) in columns:
         try:
             if title == 'status':
                 r._status = value
@@ -64,6 +70,45 @@ def _parse_run_elem(run):
 
     return r
 
+def _parse_run_elem(run):
+    " Parse a <run>...</run> elements from xml"
+
+    columns = ((col.getAttribute('title'), col.getAttribute('value'))
+               for col in run.getElementsByTagName('column'))
+    return _parse_run(run.getAttribute('name'),
+                      run.getAttribute('properties'), columns)
+
+def _parse_run_etree(run):
+    " Parse a <run>...</run> element created by iterparse"
+
+    columns = ((col.get('title', ''), col.get('value', ''))
+               for col in run.iter('column'))
+    return _parse_run(run.get('name', ''), run.get('properties', ''), columns)
+
+def _toolRunFromAttrs(getAttribute, descr = None):
+    """
+    Create a ToolRun object from the attributes of the <result> element.
+    'getAttribute' returns the value of the attribute or an empty string
+    """
+
+    tr = ToolRun()
+    tr.tool = getAttribute('tool')
+    tr.tool_version = getAttribute('version')
+    tr.date = getAttribute('date')[:19]
+    tr.options = getAttribute('options')
+    tr.timelimit = getAttribute('timelimit')
+    tr.memlimit = getAttribute('memlimit')
+    tr.benchmarkname = getAttribute('benchmarkname')
+    tr.block = getAttribute('block')
+
+    tr.name = getAttribute('name')
+    if tr.name.endswith(tr.block):
+        tr.name = tr.name[:-(len(tr.block)+1)]
+
+    tr.description = descr
+
+    return tr
+
 def _createToolRun(xmlfl, descr = None):
     """
     Parse xml attributes that contain the information
@@ -72,25 +117,126 @@ def _createToolRun(xmlfl, descr = None):
 
     roots = xmlfl.getElementsByTagName('result')
     assert len(roots) == 1
-    root = roots[0]
+    return _toolRunFromAttrs(roots[0].getAttribute, descr)
 
-    tr = ToolRun()
-    tr.tool = root.getAttribute('tool')
-    tr.tool_version = root.getAttribute('version')
-    tr.date = root.getAttribute('date')[:19]
-    tr.options = root.getAttribute('options')
-    tr.timelimit = root.getAttribute('timelimit')
-    tr.memlimit = root.getAttribute('memlimit')
-    tr.benchmarkname = root.getAttribute('benchmarkname')
-    tr.block = root.getAttribute('block')
-
-    tr.name = root.getAttribute('name')
-    if tr.name.endswith(tr.block):
-        tr.name = tr.name[:-(len(tr.block)+1)]
+# modules that open the compressed files, by the suffix of the file
+_DECOMPRESSORS = {
+    '.bz2' : bz2,
+    '.gz'  : gzip,
+    '.xz'  : lzma,
+}
 
-    tr.description = descr
+def isCompressed(path):
+    return any(path.endswith(suffix) for suffix in _DECOMPRESSORS)
 
-    return tr
+def _open(path):
+    """
+    Open the xml file for reading in binary mode. Compressed files
+    (.bz2, .gz, .xz) are decompressed on the fly while they are read.
+    """
+    for (suffix, module) in _DECOMPRESSORS.items():
+        if path.endswith(suffix):
+            return module.open(path, 'rb')
+    return open(path, 'rb')
+
+def _parse_dom(source, descr = None):
+    """
+    Parse the whole xml into memory using minidom. Return the ToolRun object
+    and a generator of DirectRunInfo objects.
+    """
+
+    with _open(source) as f:
+        xmlfl = minidom.parse(f)
+    tool_info = _createToolRun(xmlfl, descr)
+
+    def runs():
+        for run in xmlfl.getElementsByTagName('run'):
+            r = _parse_run_elem(run)
+            r._prefix = tool_info.name
+            yield r
+
+    return tool_info, runs()
+
+def _iterparse(source, descr = None):
+    """
+    Parse the xml incrementally. Return the ToolRun object created from
+    the <result> element and a generator of DirectRunInfo objects that parses
+    one <run> element at a time. The processed elements are freed,
+    so the memory usage does not depend on the size of the file.
+    """
+
+    f = _open(source)
+    try:
+        events = iterparse(f, events=('start', 'end'))
+        event, root = next(events)
+        assert event == 'start'
+        if root.tag != 'result':
+            err('Error parsing xml: expected <result> element, got <{0}>'.format(root.tag))
+    except Exception:
+        f.close()
+        raise
+
+    attrs = dict(root.attrib)
+    tool_info = _toolRunFromAttrs(lambda a: attrs.get(a, ''), descr)
+
+    def runs():
+        with f:
+            for event, elem in events:
+                if event == 'end' and elem.tag == 'run':
+                    r = _parse_run_etree(elem)
+                    r._prefix = tool_info.name
+                    # drop the processed elements (this is always
+                    # the <run> element and its siblings)
+                    root.clear()
+                    yield r
+
+    return tool_info, runs()
+
+def hashXML(path):
+    """
+    Return the SHA-256 of the (decompressed) content of the xml file
+    """
+    return hashFile(path, _open)
+
+# hashes of the files that were already imported,
+# given to the worker processes when they start
+_imported_hashes = frozenset()
+
+def _initWorker(imported_hashes):
+    global _imported_hashes
+    _imported_hashes = imported_hashes
+
+def _runTuple(r):
+    # the same layout as the query result in DBRunInfo
+    return (r.status(), r.cputime(), r.walltime(), r.memusage(),
+            r.classification(), r.exitcode(), r.property(),
+            r.fullname(), r.prefix())
+
+def _parseToBatches(filePath, descr, streaming, chunk_size, skip_imported):
+    """
+    Parse the file and return the hash of the file, the ToolRun object
+    and the list of runs in batches of tuples. This is done in worker
+    processes, tuples are cheaper to send back than the runinfo objects.
+    If 'skip_imported' is set and the file was already imported,
+    it is not parsed and the ToolRun object is None.
+    """
+    start = time()
+    digest = hashXML(filePath)
+    if skip_imported and digest in _imported_hashes:
+        return digest, None, [], time() - start
+
+    tool_info, runs = _iterparse(filePath, descr) if streaming else _parse_dom(filePath, descr)
+    batches = []
+    batch = []
+    for r in runs:
+        batch.append(_runTuple(r))
+        if len(batch) >= chunk_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+
+    return digest, tool_info, batches, time() - start
 
 class XMLParser(object):
     """
@@ -98,61 +244,173 @@ class XMLParser(object):
     into memory/database
     """
 
-    def __init__(self, db_conf = None):
+    def __init__(self, db_conf = None, streaming = True, chunk_size = 1000, jobs = 1,
+                 autocommit = True):
+        # use iterparse instead of building the whole DOM
+        self._streaming = streaming
+        # how many runs to store to the database at once
+        self._chunk_size = chunk_size
+        # how many processes parse files in parseFilesToDB()
+        self._jobs = jobs
+        # commit after storing every file, otherwise the caller
+        # commits several files at once using commit()
+        self._autocommit = autocommit
+        # hashes of the files in the import ledger, loaded when needed
+        self._imported_hashes = None
         if db_conf:
             from .. database.writer import DatabaseWriter
             self._db_writer = DatabaseWriter(db_conf)
 
+    def parse(self, filePath, descr = None):
+        """
+        Return a ToolRun object with the information from the <result>
+        element and an iterable of DirectRunInfo objects from the given
+        xml file. The file can be compressed (.bz2, .gz or .xz).
+        """
+
+        if self._streaming:
+            return _iterparse(filePath, descr)
+        return _parse_dom(filePath, descr)
+
     def parseToMem(self, filePath):
         """
         Return a ToolRun object created from a given xml file.
         """
 
-        xmlfl = minidom.parse(filePath)
-        ret = _createToolRun(xmlfl)
-
-        for run in xmlfl.getElementsByTagName('run'):
-            r = _parse_run_elem(run)
-            r._prefix = ret.name;
-            ret.append(r)
+        ret, runs = self.parse(filePath)
+        for r in runs:
+            ret.addRun(r)
 
         return ret
 
+    def forgetImportLedger(self):
+        """
+        Read the import ledger again when it is needed. Deleting a tool run
+        (e.g., in the web interface) removes its files from the ledger,
+        so a parser that imports several batches must call this
+        before each of them.
+        """
+        self._imported_hashes = None
+
+    def _getImportedHashes(self):
+        if self._imported_hashes is None:
+            self._imported_hashes = self._db_writer.getImportLedger()
+        return self._imported_hashes
+
+    def _isImported(self, filePath, digest):
+        if digest in self._getImportedHashes():
+            print(" -- Already imported this xml file: {0}".format(filePath))
+            return True
+        return False
+
     def parseToDB(self, filePath, outputs = None, descr = None,
                   append_vers = None, allow_duplicates = False):
-        writer = self._db_writer
-        xmlfl = minidom.parse(filePath)
+        """
+        Store the results from the file into the database. Files whose
+        content is in the import ledger are skipped without parsing them
+        unless 'allow_duplicates' is set. Return the pair (count, tool_run_ids).
+        """
+        digest = hashXML(filePath)
+        if not allow_duplicates and self._isImported(filePath, digest):
+            return 0, []
 
-        tool_info = _createToolRun(xmlfl, descr)
+        tool_info, runs = self.parse(filePath, descr)
+        return self._storeToDB(filePath, digest, tool_info, runs, outputs,
+                               append_vers, allow_duplicates)
+
+    def _storeToDB(self, filePath, digest, tool_info, runs, outputs,
+                   append_vers, allow_duplicates):
+        writer = self._db_writer
         if append_vers:
             tool_info.tool_version += append_vers
 
         if tool_info.block == '':
             print(" -- Skipping overall category row (mamato frontend adds this automatically)")
+            self._addToLedger(filePath, digest)
             return 0, []
 
         tool_run_id = writer.getOrCreateToolInfoID(tool_info, outputs)
         benchmarks_set_id = writer.getOrCreateBenchmarksSetID(tool_info.block)
 
         rcnt = writer.getRunCount(tool_run_id, benchmarks_set_id)
-        if rcnt and rcnt > 0:
+        if rcnt and rcnt > 0 and not allow_duplicates:
             print(" -- Already have results for this xml file: {0}".format(filePath))
             print(" -- The results are under id {0}, benchmarks set id {1}".format(tool_run_id, benchmarks_set_id))
+            self._addToLedger(filePath, digest, tool_run_id, benchmarks_set_id)
             return 0, []
 
         assert tool_run_id is not None
         assert benchmarks_set_id is not None
 
-        cnt = 0;
-        for run in xmlfl.getElementsByTagName('run'):
-            r = _parse_run_elem(run)
-            r._prefix = tool_info.name;
-            writer.writeRunInfo(tool_run_id, benchmarks_set_id, r)
-            cnt += 1
-
-        writer.commit()
+        cnt = writer.writeRunInfos(tool_run_id, benchmarks_set_id, runs,
+                                   self._chunk_size)
+        writer.updateToolRunStats(tool_run_id, benchmarks_set_id)
+        writer.bumpDataGeneration()
+        self._addToLedger(filePath, digest, tool_run_id, benchmarks_set_id)
         return cnt, [tool_run_id]
 
+    def _addToLedger(self, filePath, digest, tool_run_id = None, benchmarks_set_id = None):
+        # in the same transaction as the results
+        self._db_writer.addToImportLedger(digest, filePath, tool_run_id, benchmarks_set_id)
+        self._getImportedHashes().add(digest)
+        if self._autocommit:
+            self._db_writer.commit()
+
+    def getDBWriter(self):
+        return self._db_writer
+
+    def commit(self):
+        self._db_writer.commit()
+
+    def parseFilesToDB(self, files, outputs = None, descr = None,
+                       append_vers = None, allow_duplicates = False):
+        """
+        Store the results from all the given files into the database.
+        Generate a triple (file, (count, tool_run_ids), seconds) for each file
+        in the order of the files (the pair is what parseToDB returns).
+        If the parser has more jobs, the files are parsed in worker
+        processes and this process only stores the results.
+        """
+        if self._jobs <= 1 or len(files) <= 1:
+            for f in files:
+                start = time()
+                res = self.parseToDB(f, outputs, descr, append_vers, allow_duplicates)
+                yield f, res, time() - start
+            return
+
+        # the workers skip the files that were imported before
+        # this call, the files with the same content given in this call
+        # are parsed, but not stored
+        imported = frozenset() if allow_duplicates else frozenset(self._getImportedHashes())
+        with ProcessPoolExecutor(max_workers = self._jobs, initializer = _initWorker,
+                                 initargs = (imported,)) as pool:
+            submit = lambda f: pool.submit(_parseToBatches, f, descr, self._streaming,
+                                           self._chunk_size, not allow_duplicates)
+            # do not parse too far ahead of the writer,
+            # the parsed files wait in memory
+            pending = deque()
+            files = iter(files)
+            for f in files:
+                pending.append((f, submit(f)))
+                if len(pending) >= 2 * self._jobs:
+                    break
+
+            while pending:
+                f, future = pending.popleft()
+                digest, tool_info, batches, parse_time = future.result()
+                for nf in files:
+                    pending.append((nf, submit(nf)))
+                    break
+
+                start = time()
+                if not allow_duplicates and self._isImported(f, digest):
+                    res = (0, [])
+                else:
+                    runs = (DBRunInfo(r) for batch in batches for r in batch)
+                    res = self._storeToDB(f, digest, tool_info, runs, outputs,
+                                          append_vers, allow_duplicates)
+                yield f, res, parse_time + time() - start
+
 
 if __name__ == "__main__":
     import sys
@@ -32,7 +32,8 @@ function changeSettings(obj) {
         if (x == '') {
             continue;
         }
-        if (x[0] != key) {
+        // changed settings change the results, start from the first page
+        if (x[0] != key && x[0] != 'page') {
             new_search += "&" + kvp[i];
         }
     }
@@ -61,16 +62,18 @@ function toggleSettings(obj) {
             // remove the key from url
             found = true;
             continue;
+        } else if (x[0] == 'page') {
+            // changed settings change the results, start from the first page
+            continue;
         } else {
             new_search += "&" + kvp[i];
         }
     }
 
     if (!found) {
-        document.location.search += "&" + key + "=" + value;
-    } else {
-        document.location.search = new_search;
+        new_search += "&" + key + "=" + value;
     }
+    document.location.search = new_search;
 }
 
 function updateFilters(filtName = 'filter') {
@@ -92,7 +95,7 @@ function updateFilters(filtName = 'filter') {
     var new_search="";
     while (i--) {
         var x = kvp[i].split('=');
-        if (x == '' || x[0] == filtName) {
+        if (x == '' || x[0] == filtName || x[0] == 'page') {
             continue;
         } else {
             new_search += "&" + kvp[i];
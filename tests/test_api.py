@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+#
+# Check that the responses of /api are valid JSON
+# for the data that the pages show.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import sys
+import json
+import unittest
+import warnings
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# quik complains about its own regular expressions
+warnings.simplefilter('ignore', FutureWarning)
+
+from brv.toolrun import DBToolRun
+from brv.tagsmanager import Tag
+from brv.server.api import apiToolRuns
+
+class FakeDataManager(object):
+    def __init__(self):
+        self._runs = [DBToolRun((i, 'tool', '1.{0}'.format(i), '2017-11-10 10:20:30',
+                                 '--opt', '900 s', '8000000000B', 'run {0}'.format(i),
+                                 None, None))
+                      for i in (1, 2)]
+        self._tags = {1 : [Tag('reference', 'color: green'), Tag('old')]}
+
+    def getToolRuns(self, which = []):
+        return [r for r in self._runs if not which or r.getID() in which]
+
+    def getToolRunTags(self, run):
+        return self._tags.get(run.getID(), [])
+
+class ApiTest(unittest.TestCase):
+    def test_tool_runs_with_tags(self):
+        out = BytesIO()
+        apiToolRuns(out, FakeDataManager(), {})
+        runs = json.loads(out.getvalue().decode('utf-8'))
+        self.assertEqual([r['id'] for r in runs], [1, 2])
+        self.assertEqual(runs[0]['tags'], ['reference', 'old'])
+        self.assertEqual(runs[1]['tags'], [])
+
+if __name__ == '__main__':
+    unittest.main()
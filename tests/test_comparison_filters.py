@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+#
+# Check that the comparison filters evaluated by the database
+# (COMPARISON_FILTERS) select the same benchmarks as the filters
+# that the handlers used to evaluate in Python. The HAVING conditions
+# run in an in-memory SQLite database with the same grouping
+# as DatabaseReader.getComparisonPage.
+#
+# Usage: python -m unittest discover tests
+
+import os
+import re
+import sys
+import sqlite3
+import random
+import unittest
+from itertools import combinations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from brv.runinfo import DirectRunInfo
+from brv.database.comparison import COMPARISON_FILTERS, comparisonHaving
+
+RESULTS = [('true', 'correct'), ('false(unreach-call)', 'wrong'),
+           ('false(unreach-call)', 'correct'), ('TIMEOUT', 'error'),
+           ('unknown', 'unknown'), ('true', 'wrong')]
+# around the boundaries of the time filters (1 s, 1.1x and 1.5x)
+CPUTIMES = [0.5, 1.0, 1.05, 1.1, 2.0, 2.1, 2.3, 3.0, 10.0, 11.0, 15.0, 16.0]
+
+# the filters as the handlers evaluated them before they were moved
+# to the database, rows are lists of runinfos (None for a missing result)
+def _some_different(get):
+    def fun(L):
+        value = None if L[0] is None else get(L[0])
+        for r in L:
+            if r is None:
+                if value is not None:
+                    return True
+            elif get(r) != value:
+                return True
+        return False
+    return fun
+
+def _time_diff(ratio):
+    def fun(L):
+        min_x = min(L, key=lambda x: sys.float_info.max if x is None else x.cputime())
+        max_x = max(L, key=lambda x: -1 if x is None else x.cputime())
+        return min_x.cputime() > 1 and max_x.cputime() > min_x.cputime() * ratio
+    return fun
+
+PYTHON_FILTERS = {
+    'different_result'  : _some_different(lambda r: (r.status(), r.classification())),
+    'different_status'  : _some_different(lambda r: r.status()),
+    'different_classif' : _some_different(lambda r: r.classification()),
+    'incorrect'         : lambda L: any(r is not None and r.classification() == 'wrong'
+                                        for r in L),
+    'time_diff_10'      : _time_diff(1.1),
+    'time_diff_50'      : _time_diff(1.5),
+    'all_present'       : lambda L: all(r is not None for r in L),
+}
+
+def _sqlite(cond):
+    # SQLite's COUNT(DISTINCT ...) takes only one argument,
+    # count the distinct concatenations instead
+    ret = re.sub(r'COUNT\(DISTINCT (COALESCE\(\w+, \'\'\)),\s*(COALESCE\(\w+, \'\'\))\)',
+                 r"COUNT(DISTINCT \1 || char(31) || \2)", cond)
+    assert not re.search(r'COUNT\(DISTINCT [^()]*\([^()]*\),', ret), ret
+    return ret
+
+def _fixture(tools, benchmarks):
+    """
+    Return the rows {file : [runinfo or None for each tool run]},
+    every benchmark has at least one result
+    """
+    rnd = random.Random(0)
+    rows = {}
+    for i in range(benchmarks):
+        name = 'sv-benchmarks/c/file{0:04d}.c'.format(i)
+        infos = []
+        for t in range(tools):
+            if rnd.random() < 0.1:
+                infos.append(None)
+                continue
+            r = DirectRunInfo(name)
+            r._status, r._classification = rnd.choice(RESULTS)
+            r._cputime = rnd.choice(CPUTIMES)
+            infos.append(r)
+        if all(r is None for r in infos):
+            continue
+        rows[name] = infos
+    return rows
+
+class ComparisonFiltersTest(unittest.TestCase):
+    def _check(self, tools):
+        rows = _fixture(tools, 600)
+        db = sqlite3.connect(':memory:')
+        db.execute("""CREATE TABLE run (tool_run_id INTEGER, status TEXT,
+                                         classification TEXT, cputime REAL, file TEXT)""")
+        for (name, infos) in rows.items():
+            for (tool_run_id, r) in enumerate(infos, 1):
+                if r is not None:
+                    db.execute('INSERT INTO run VALUES (?, ?, ?, ?, ?)',
+                               (tool_run_id, r.status(), r.classification(),
+                                r.cputime(), name))
+
+        names = sorted(COMPARISON_FILTERS)
+        cases = [(f,) for f in names] + list(combinations(names, 2))
+        for filters in cases:
+            with self.subTest(tools = tools, filters = filters):
+                q = 'SELECT file FROM run GROUP BY file {0};'.format(
+                    _sqlite(comparisonHaving(list(filters), tools)))
+                got = set(r[0] for r in db.execute(q))
+                expected = set(name for (name, infos) in rows.items()
+                               if all(PYTHON_FILTERS[f](infos) for f in filters))
+                self.assertEqual(got, expected)
+                if tools > 1 and len(filters) == 1:
+                    # the fixture must exercise the filter
+                    self.assertTrue(0 < len(expected) < len(rows))
+
+    def test_three_tool_runs(self):
+        self._check(3)
+
+    def test_one_tool_run(self):
+        self._check(1)
+
+if __name__ == '__main__':
+    unittest.main()